@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+import os
+import json
+import random
+import shutil
+import platform
+import argparse
+import tempfile
+import tracemalloc
+import subprocess
+import time
+from contextlib import redirect_stdout
+from datetime import datetime
+
+from rename import OlympiadRenamer, plan_tree, apply_renames
+
+PREFIXES = ['ksn', 'KSN-K', 'ksn-p', 'osp', 'OSN', 'osnk', 'osn-p', 'provinsi', 'kabupaten',
+            'kota', 'inamo', 'shortlist', 'usulan', 'misc']
+CONTENTS = ['soal', 'solusi', 'kunci', 'pembahasan', 'soal dan solusi', '']
+EXTRAS = ['d1', 'day 2', 'hari pertama', 'hari 2', 'tipe 1', 'isian singkat', 'pilgan', 'bagian b',
+          'essay', '']
+AUTHORS = ['miftah', 'tohir', 'pebrudal', 'konsep-matematika', 'wildan', 'siaposn', '']
+NOISE = ['final', 'rev', 'copy', '(1)', 'scan', 'matematika', '']
+SEPARATORS = [' ', '_', '-', '  ']
+
+DEFAULT_SIZES = '1000,10000,100000,1000000'
+
+
+def generate_names(count, seed=0):
+    """Generate messy olympiad filenames (without extension)."""
+    rng = random.Random(seed)
+    names = []
+    for _ in range(count):
+        year = rng.randint(1998, 2026)
+        year_text = str(year) if rng.random() < 0.7 else f'{year % 100:02d}'
+        parts = [rng.choice(PREFIXES), year_text, rng.choice(CONTENTS),
+                 rng.choice(EXTRAS), rng.choice(AUTHORS), rng.choice(NOISE)]
+        rng.shuffle(parts[2:])
+        name = rng.choice(SEPARATORS).join(part for part in parts if part)
+        if rng.random() < 0.3:
+            name = name.upper()
+        names.append(name)
+    return names
+
+
+def classify_per_method(renamer, normalized_name):
+    """The per-method path process_file used before RuleMatcher."""
+    year = renamer.extract_year(normalized_name)
+    if not year:
+        return None
+    if renamer.is_shortlist(normalized_name):
+        return f"Shortlist - {year} - Official.pdf"
+    olympiad_type = renamer.extract_type(normalized_name)
+    if not olympiad_type:
+        return None
+    new_name_parts = [olympiad_type, str(year), renamer.extract_content(normalized_name)]
+    day = renamer.extract_day(normalized_name)
+    if day:
+        new_name_parts.append(day)
+    author = renamer.extract_author(normalized_name)
+    if author:
+        new_name_parts.append(author)
+    new_name = ' - '.join(new_name_parts)
+    if '.pdf' not in new_name:
+        new_name += '.pdf'
+    return new_name
+
+
+def bench_matcher(names, tingkatan=' SMP', repeat=3):
+    renamer = OlympiadRenamer(tingkatan)
+    normalized = [renamer.normalize_spacing(name) for name in names]
+
+    mismatches = [name for name in normalized
+                  if classify_per_method(renamer, name) != renamer.classify_name(name)[0]]
+    if mismatches:
+        raise AssertionError(f"{len(mismatches)} names differ, e.g. {mismatches[:3]}")
+
+    results = {}
+    for label, classify in [('per-method', lambda n: classify_per_method(renamer, n)),
+                            ('single-pass', lambda n: renamer.classify_name(n)[0])]:
+        best = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for name in normalized:
+                classify(name)
+            best = min(best, time.perf_counter() - start)
+        results[label] = len(normalized) / best
+        print(f"{label:>12}: {results[label]:>12,.0f} files/sec")
+    print(f"{'speedup':>12}: {results['single-pass'] / results['per-method']:.2f}x")
+    return results
+
+
+def measure(phase, size, run, memory_run=None):
+    """Time run(), then trace memory_run() (default: run again) for the peak.
+
+    Returns a result dict with files/sec and peak traced bytes.
+    """
+    start = time.perf_counter()
+    run()
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    (memory_run or run)()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    result = {
+        'phase': phase,
+        'size': size,
+        'seconds': round(elapsed, 4),
+        'files_per_sec': round(size / elapsed if elapsed else 0.0, 1),
+        'peak_bytes': peak,
+    }
+    return result
+
+
+def create_corpus(root, names, per_directory=1000):
+    """Create empty PDFs spread over subdirectories; returns the file count."""
+    created = 0
+    for start in range(0, len(names), per_directory):
+        directory = os.path.join(root, f'batch-{start // per_directory:05d}')
+        os.makedirs(directory)
+        for name in set(names[start:start + per_directory]):
+            open(os.path.join(directory, name + '.pdf'), 'wb').close()
+            created += 1
+    return created
+
+
+def bench_size(size, renamer, scratch_dir, max_fs_size):
+    names = generate_names(size, seed=size)
+    normalized = [renamer.normalize_spacing(name) for name in names]
+    pdf_names = [name + '.pdf' for name in names]
+    results = []
+
+    results.append(measure('extract_year', size,
+                           lambda: [renamer.extract_year(name) for name in normalized]))
+    results.append(measure('classify', size,
+                           lambda: [renamer.plan_name(name) for name in pdf_names]))
+
+    if size > max_fs_size:
+        return results
+
+    root = tempfile.mkdtemp(prefix='renamer-bench-', dir=scratch_dir)
+    try:
+        file_count = create_corpus(root, names)
+        plan = []
+
+        def run_plan():
+            plan[:] = [(None, source, target)
+                       for source, target, status in plan_tree(renamer, root, recursive=True)
+                       if status == 'rename']
+
+        results.append(measure('plan', file_count, run_plan))
+        # Time the renames, then trace memory while renaming everything back
+        results.append(measure('rename', file_count,
+                               lambda: apply_renames(plan),
+                               lambda: apply_renames([(None, target, source)
+                                                      for _, source, target in plan])))
+    finally:
+        shutil.rmtree(root)
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare_runs(previous, current):
+    """Print the throughput change of each phase/size against a previous run."""
+    before = {(r['phase'], r['size']): r['files_per_sec'] for r in previous['results']}
+    print(f"\nCompared with {previous.get('revision') or 'previous run'} ({previous['timestamp']}):")
+    for result in current['results']:
+        old = before.get((result['phase'], result['size']))
+        if old:
+            change = result['files_per_sec'] / old - 1
+            print(f"{result['phase']:>12} {result['size']:>9}: {change:+7.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark OlympiadRenamer classification and renaming')
+    parser.add_argument('--sizes', default=DEFAULT_SIZES,
+                      help=f'Comma separated corpus sizes (default: {DEFAULT_SIZES})')
+    parser.add_argument('--max-fs-size', type=int, default=100000,
+                      help='Largest corpus to create on disk for plan/rename (default: 100000)')
+    parser.add_argument('--scratch-dir', default='/dev/shm' if os.path.isdir('/dev/shm') else None,
+                      help='Directory for the on-disk corpus, ideally tmpfs (default: /dev/shm)')
+    parser.add_argument('-o', '--output', default='benchmark-results.json',
+                      help='JSON file the run is appended to (default: benchmark-results.json)')
+    parser.add_argument('--matcher', type=int, metavar='N',
+                      help='Only compare the single-pass matcher with the per-method path on N names')
+    args = parser.parse_args()
+
+    if args.matcher:
+        print(f"Classifying {args.matcher} synthetic filenames...")
+        bench_matcher(generate_names(args.matcher))
+        return
+
+    renamer = OlympiadRenamer(' SMP')
+    run = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'results': [],
+    }
+
+    for size in (int(size) for size in args.sizes.split(',')):
+        # plan_name reports every unclassifiable file, keep that out of the timings
+        with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+            results = bench_size(size, renamer, args.scratch_dir, args.max_fs_size)
+        for result in results:
+            print(f"{result['phase']:>12} {result['size']:>9}: "
+                  f"{result['files_per_sec']:>12,.0f} files/sec, "
+                  f"peak {result['peak_bytes'] / 2**20:8.1f} MiB")
+        run['results'].extend(results)
+
+    history = []
+    if os.path.exists(args.output):
+        with open(args.output, 'r', encoding='utf-8') as f:
+            history = json.load(f)
+    if history:
+        compare_runs(history[-1], run)
+    history.append(run)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(history, f, indent=2)
+    print(f"\nResults appended to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
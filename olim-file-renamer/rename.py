@@ -1,9 +1,185 @@
 #!/usr/bin/env python3
 import os
 import re
+import sys
+import json
+import errno
+import ctypes
 import shutil
+import sqlite3
+import hashlib
+import threading
+import time
 from pathlib import Path
 import argparse
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from itertools import islice
+
+YEAR_4_DIGIT = re.compile(r'20[0-2][0-9]')
+YEAR_2_DIGIT = re.compile(r'[^0-9](\d{2})[^0-9]')
+YEAR_2_DIGIT_END = re.compile(r'(\d{2})$')
+SHORTLIST = re.compile(r'shortlist|usulan')
+SEPARATORS = re.compile(r'[_\s]+')
+
+MANIFEST_VERSION = 1
+
+
+def trie_pattern(keys):
+    """Build an alternation of literal keys factored into a trie.
+
+    At any position the regex matches the longest key starting there, and
+    every other key starting at that position is a prefix of it.
+    """
+    trie = {}
+    for key in keys:
+        node = trie
+        for char in key:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def build(node):
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if '' in node:
+            return '(?:' + body + ')?'
+        return body
+
+    return build(trie)
+
+
+class RuleMatcher:
+    """Single-pass matcher for the type, content, author and tipe rules.
+
+    All literal keys are compiled into one trie regex that is scanned once
+    with an overlapping lookahead over the lowercased filename. Each field
+    keeps the semantics of its extract_* method: the first key in dict order
+    that occurs anywhere in the name wins, except content where the last one
+    wins. Day rules are regexes rather than literals, so they are precompiled
+    and searched over the same lowercased name.
+    """
+
+    FIELDS = ('type', 'content', 'author', 'tipe')
+
+    def __init__(self, type_translations, content_translations, author, tipe, day_patterns):
+        rules = {
+            'type': type_translations,
+            'content': content_translations,
+            'author': author,
+            'tipe': tipe,
+        }
+
+        # Lower rank wins; content ranks are negated so its last key wins
+        self.values = {}
+        ranks = {}
+        for field, translations in rules.items():
+            sign = -1 if field == 'content' else 1
+            self.values[field] = {}
+            for i, (key, official_name) in enumerate(translations.items()):
+                self.values[field][sign * i] = official_name
+                ranks[field, key] = sign * i
+
+        # Every key matching at a position is a prefix of the longest one
+        keys = {key for translations in rules.values() for key in translations}
+        self.hits = {}
+        for key in keys:
+            hits = []
+            for end in range(1, len(key) + 1):
+                for field in self.FIELDS:
+                    rank = ranks.get((field, key[:end]))
+                    if rank is not None:
+                        hits.append((field, rank))
+            self.hits[key] = tuple(hits)
+
+        self.scanner = re.compile(f'(?=({trie_pattern(keys)}))')
+
+        # IGNORECASE defeats the regex prefix scan. On an already lowercased
+        # ASCII name it changes nothing for a pattern with no uppercase
+        # letters and no escapes that could spell one, so those also get a
+        # case-sensitive twin.
+        self.days = []
+        for pattern, replacement in day_patterns.items():
+            exact = re.compile(pattern, re.IGNORECASE)
+            fast = exact
+            if pattern.isascii() and pattern == pattern.lower() and not re.search(r'\\[0-9xuUN]', pattern):
+                fast = re.compile(pattern)
+            self.days.append((fast, exact, replacement))
+
+    def match(self, filename):
+        """Return a dict with the official name matched for each field (or None)."""
+        filename = filename.lower()
+        best = {}
+        hits = self.hits
+        for key in self.scanner.findall(filename):
+            for field, rank in hits[key]:
+                if field not in best or rank < best[field]:
+                    best[field] = rank
+
+        result = {field: None for field in self.FIELDS}
+        for field, rank in best.items():
+            result[field] = self.values[field][rank]
+        result['day'] = None
+        is_ascii = filename.isascii()
+        for fast, exact, replacement in self.days:
+            if (fast if is_ascii else exact).search(filename):
+                result['day'] = replacement
+                break
+        return result
+
+
+class ClassificationCache:
+    """On-disk cache of classify_name results keyed by normalized stem.
+
+    Entries are stored in SQLite under the renamer's ruleset hash, so editing
+    a translation, the year range or the tingkatan starts from an empty
+    namespace instead of serving stale names. The current namespace is read
+    into memory on open and new entries are written back in one transaction
+    on close.
+    """
+
+    def __init__(self, path, ruleset):
+        self.ruleset = ruleset
+        self.db = sqlite3.connect(path)
+        self.db.execute(
+            'CREATE TABLE IF NOT EXISTS classifications ('
+            'ruleset TEXT NOT NULL, name TEXT NOT NULL, new_name TEXT, error TEXT, '
+            'PRIMARY KEY (ruleset, name)) WITHOUT ROWID')
+        rows = self.db.execute(
+            'SELECT name, new_name, error FROM classifications WHERE ruleset = ?', (ruleset,))
+        self.entries = {name: (new_name, error) for name, new_name, error in rows}
+        self.pending = {}
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def lookup(self, name, classify):
+        """Return the cached (new_name, error) for name, classifying on a miss."""
+        result = self.entries.get(name)
+        if result is not None:
+            with self.lock:
+                self.hits += 1
+            return result
+        result = classify(name)
+        with self.lock:
+            self.misses += 1
+            self.entries[name] = self.pending[name] = result
+        return result
+
+    def stats(self):
+        total = self.hits + self.misses
+        rate = self.hits / total if total else 0.0
+        return f"Cache: {self.hits}/{total} hits ({rate:.1%}), {len(self.pending)} new entries"
+
+    def close(self):
+        with self.db:
+            self.db.executemany(
+                'INSERT OR REPLACE INTO classifications VALUES (?, ?, ?, ?)',
+                [(self.ruleset, name, new_name, error)
+                 for name, (new_name, error) in self.pending.items()])
+        self.pending.clear()
+        self.db.close()
+
 
 class OlympiadRenamer:
     MIN_YEAR = 2002
@@ -72,23 +248,48 @@ class OlympiadRenamer:
         'bagian c': 'Bagian C'
     }
 
-    def __init__(self, tingkatan):
+    def __init__(self, tingkatan, cache=None):
         self.day_patterns = {
             r'd1|day\s*1|hari\s*1|hari\s*pertama': 'Hari 1',
             r'd2|day\s*2|hari\s*2|hari\s*kedua': 'Hari 2'
         }
         self.tingkatan = tingkatan
+        self.matcher = self.build_matcher()
+        self.cache = cache
+
+    # Compiled matchers shared by every renamer using the same rules
+    _matchers = {}
+
+    def rules_key(self):
+        return repr((self.TYPE_TRANSLATIONS, self.CONTENT_TRANSLATIONS, self.AUTHOR,
+                     self.TIPE, self.day_patterns))
+
+    def ruleset_hash(self):
+        """Hash of everything classify_name depends on, used to key the cache."""
+        rules = (self.rules_key(), self.MIN_YEAR, self.MAX_YEAR, self.tingkatan,
+                 YEAR_4_DIGIT.pattern, YEAR_2_DIGIT.pattern, YEAR_2_DIGIT_END.pattern,
+                 SHORTLIST.pattern)
+        return hashlib.sha256(repr(rules).encode('utf-8')).hexdigest()
+
+    def build_matcher(self):
+        key = self.rules_key()
+        matcher = self._matchers.get(key)
+        if matcher is None:
+            matcher = RuleMatcher(self.TYPE_TRANSLATIONS, self.CONTENT_TRANSLATIONS,
+                                  self.AUTHOR, self.TIPE, self.day_patterns)
+            self._matchers[key] = matcher
+        return matcher
 
     def extract_year(self, filename):
         # Try to find 4-digit year first
-        year_match = re.search(r'20[0-2][0-9]', filename)
+        year_match = YEAR_4_DIGIT.search(filename)
         if year_match:
             year = int(year_match.group())
             if self.MIN_YEAR <= year <= self.MAX_YEAR:
                 return year
 
         # Try to find 2-digit year
-        year_match = re.search(r'[^0-9](\d{2})[^0-9]', f' {filename} ')
+        year_match = YEAR_2_DIGIT.search(f' {filename} ')
         if year_match:
             year = int(year_match.group(1))
             full_year = 2000 + year
@@ -96,7 +297,7 @@ class OlympiadRenamer:
                 return full_year
             
         # Try to find 2-digit year at the end of the filename
-        year_match = re.search(r'(\d{2})$', filename)
+        year_match = YEAR_2_DIGIT_END.search(filename)
         if year_match:
             year = int(year_match.group(1))
             full_year = 2000 + year
@@ -115,7 +316,7 @@ class OlympiadRenamer:
         return None
 
     def is_shortlist(self, filename):
-        return bool(re.search(r'shortlist|usulan', filename.lower()))
+        return bool(SHORTLIST.search(filename.lower()))
 
     def extract_content(self, filename):
         final_name = "0000"
@@ -137,7 +338,7 @@ class OlympiadRenamer:
 
     def normalize_spacing(self, text):
         # Remove extra spaces and normalize separators
-        text = re.sub(r'[_\s]+', ' ', text)
+        text = SEPARATORS.sub(' ', text)
         return text.strip()
 
     def extract_author(self, filename):
@@ -154,63 +355,494 @@ class OlympiadRenamer:
                 return official_name
         return None
 
-    def process_file(self, filepath):
-        path = Path(filepath)
-        if path.suffix.lower() != '.pdf':
-            print(f"Skipping '{path.name}' (not a PDF file)")
-            return False
+    def classify_name(self, normalized_name):
+        """Build the new filename in a single matcher pass.
 
-        # Normalize filename for better pattern matching
-        normalized_name = self.normalize_spacing(path.stem)
-        
-        # Extract components
+        Returns (new_name, error); exactly one of them is None.
+        """
         year = self.extract_year(normalized_name)
         if not year:
-            print(f"Error: Could not determine valid year for '{path.name}'")
-            return False
+            return None, "Could not determine valid year"
 
         # Check if it's a shortlist file first
         if self.is_shortlist(normalized_name):
-            new_name = f"Shortlist - {year} - Official.pdf"
+            return f"Shortlist - {year} - Official.pdf", None
+
+        fields = self.matcher.match(normalized_name)
+        if not fields['type']:
+            return None, "Could not determine type (OSK/OSP/OSN)"
+        olympiad_type = fields['type'] + self.tingkatan
+
+        content = fields['content'] or "0000"
+        if fields['tipe']:
+            content += " " + fields['tipe']
+
+        # Construct new filename
+        new_name_parts = [olympiad_type, str(year), content]
+        if fields['day']:
+            new_name_parts.append(fields['day'])
+        if fields['author']:
+            new_name_parts.append(fields['author'])
+        new_name = ' - '.join(new_name_parts)
+        if '.pdf' not in new_name:
+            new_name += '.pdf'
+        return new_name, None
+
+    def plan_file(self, path):
+        """Return the new filename for path, or None if it cannot be renamed."""
+        return self.plan_name(path.name)
+
+    def plan_name(self, name):
+        stem, suffix = os.path.splitext(name)
+        if suffix.lower() != '.pdf':
+            print(f"Skipping '{name}' (not a PDF file)")
+            return None
+
+        # Normalize filename for better pattern matching
+        normalized_name = self.normalize_spacing(stem)
+
+        if self.cache is None:
+            new_name, error = self.classify_name(normalized_name)
         else:
-            # Regular file processing
-            olympiad_type = self.extract_type(normalized_name)
-            if not olympiad_type:
-                print(f"Error: Could not determine type (OSK/OSP/OSN) for '{path.name}'")
-                return False
-
-            content = self.extract_content(normalized_name)
-            day = self.extract_day(normalized_name)
-            author = self.extract_author(normalized_name)
-
-            # Construct new filename
-            new_name_parts = [olympiad_type, str(year), content]
-            if day:
-                new_name_parts.append(day)
-            if author:
-                new_name_parts.append(author)
-            new_name = ' - '.join(new_name_parts)
-            if '.pdf' not in new_name:
-                new_name += '.pdf'
+            new_name, error = self.cache.lookup(normalized_name, self.classify_name)
+        if error:
+            print(f"Error: {error} for '{name}'")
+            return None
+        return new_name
+
+    def plan_entry(self, dir_path, name, taken):
+        """Plan the rename of one PDF in dir_path.
+
+        taken holds every name in the directory plus the targets already
+        handed out, so collisions are numbered without exists() calls; the
+        chosen target is added to it. Returns a (source, target, status)
+        record where status is 'rename', 'skip' (already in correct format)
+        or 'error' (target is None).
+        """
+        source = os.path.join(dir_path, name)
+        new_name = self.plan_name(name)
+        if new_name is None:
+            return source, None, 'error'
+        # A numbered duplicate from an earlier run is already in format too
+        if name == new_name or is_numbered(name, new_name):
+            print(f"Skipping '{name}' (already in correct format)")
+            return source, source, 'skip'
+        new_name = free_name(new_name, taken)
+        taken.add(new_name)
+        return source, os.path.join(dir_path, new_name), 'rename'
+
+    def iter_plan(self, root, recursive=True):
+        """Lazily yield a (source, target, status) record for every PDF under root.
+
+        Directories are walked with an explicit stack instead of recursion,
+        so deep trees cost no Python frames, and each record is yielded as
+        soon as its file is classified. Memory is bounded by the name set of
+        the largest single directory, which collision resolution needs;
+        PDFs are planned in sorted order so the targets are deterministic.
+        """
+        stack = [root]
+        while stack:
+            dir_path = stack.pop()
+            taken, pdf_names, subdirs = scan_directory(dir_path, recursive)
+            stack.extend(reversed(subdirs))
+            for name in pdf_names:
+                yield self.plan_entry(dir_path, name, taken)
+
+    def process_file(self, filepath):
+        path = Path(filepath)
+        new_name = self.plan_file(path)
+        if new_name is None:
+            return False
 
         # Skip if already in correct format
-        if path.name == new_name:
+        if path.name == new_name or is_numbered(path.name, new_name):
             print(f"Skipping '{path.name}' (already in correct format)")
             return True
 
         # Construct new path
         new_path = path.parent / new_name
 
+        # If destination exists, number it (1, 2, 3, etc.)
+        stem, suffix = os.path.splitext(new_name)
+        n = 1
+        while new_path.exists():
+            new_path = path.parent / f"{stem} ({n}){suffix}"
+            n += 1
+        return rename_path(path, new_path)
+
+
+AT_FDCWD = -100
+RENAME_NOREPLACE = 1
+# Errors meaning the filesystem cannot do the operation, not that it failed
+UNSUPPORTED = {errno.EINVAL, errno.ENOSYS, errno.ENOTSUP, errno.EOPNOTSUPP}
+NO_HARD_LINKS = {errno.EPERM, errno.ENOTSUP, errno.EOPNOTSUPP, errno.EMLINK, errno.EXDEV}
+
+
+def load_renameat2():
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        return ctypes.CDLL(None, use_errno=True).renameat2
+    except (OSError, AttributeError):
+        return None
+
+
+renameat2 = load_renameat2()
+
+
+def rename_noreplace(source, target):
+    """renameat2(RENAME_NOREPLACE): one atomic call; False if unsupported here."""
+    if renameat2 is None:
+        return False
+    if renameat2(AT_FDCWD, os.fsencode(source), AT_FDCWD, os.fsencode(target),
+                 RENAME_NOREPLACE) == 0:
+        return True
+    error = ctypes.get_errno()
+    if error in UNSUPPORTED:
+        return False
+    raise OSError(error, os.strerror(error), os.fspath(target))
+
+
+def link_noreplace(source, target):
+    """Hard link then unlink; filesystems without hard links reserve the target with O_EXCL."""
+    try:
+        os.link(source, target)
+    except OSError as e:
+        if isinstance(e, FileExistsError) or e.errno not in NO_HARD_LINKS:
+            raise
+        os.close(os.open(target, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644))
         try:
-            # If destination exists, make it double (1, 2, 3, etc.)
-            if new_path.exists():
-                new_path = new_path.with_name(f"{new_path.stem} (1){new_path.suffix}")
-            path.rename(new_path)
-            print(f"Renamed: '{path.name}' → '{new_name}'")
-            return True
-        except Exception as e:
-            print(f"Error renaming '{path.name}': {e}")
+            os.replace(source, target)
+        except BaseException:
+            os.unlink(target)
+            raise
+        return
+    os.unlink(source)
+
+
+def rename_no_clobber(source, target):
+    """Rename source to target, raising FileExistsError instead of replacing target.
+
+    os.rename silently overwrites an existing file, which a manifest planned
+    earlier cannot rule out. On Linux renameat2(RENAME_NOREPLACE) refuses in
+    a single call; elsewhere a hard link fails instead of overwriting.
+    """
+    try:
+        if not rename_noreplace(source, target):
+            link_noreplace(source, target)
+    except FileExistsError:
+        # A case-only rename on a case-insensitive filesystem
+        if not os.path.samefile(source, target):
+            raise
+        os.rename(source, target)
+
+
+def rename_path(source, target):
+    try:
+        rename_no_clobber(source, target)
+        print(f"Renamed: '{os.path.basename(source)}' → '{os.path.basename(target)}'")
+        return True
+    except FileExistsError:
+        print(f"Error renaming '{os.path.basename(source)}': "
+              f"'{os.path.basename(target)}' already exists, not overwriting it")
+        return False
+    except Exception as e:
+        print(f"Error renaming '{os.path.basename(source)}': {e}")
+        return False
+
+
+def is_numbered(name, new_name):
+    """True if name is a 'new_name (n)' variant, as free_name hands out."""
+    stem, suffix = os.path.splitext(new_name)
+    return re.fullmatch(re.escape(stem) + r' \(\d+\)' + re.escape(suffix), name) is not None
+
+
+def free_name(name, taken):
+    """Return name, or its first 'name (n)' variant that is not in taken."""
+    if name not in taken:
+        return name
+    stem, suffix = os.path.splitext(name)
+    n = 1
+    while f"{stem} ({n}){suffix}" in taken:
+        n += 1
+    return f"{stem} ({n}){suffix}"
+
+
+def scan_directory(dir_path, recursive):
+    """List one directory for planning.
+
+    Returns (taken, pdf_names, subdirs): the set of every name in the
+    directory, its PDF names sorted, and its subdirectories sorted (empty
+    unless recursive).
+    """
+    taken = set()
+    pdf_names = []
+    subdirs = []
+    with os.scandir(dir_path) as entries:
+        for entry in entries:
+            taken.add(entry.name)
+            if entry.is_file() and entry.name.lower().endswith('.pdf'):
+                pdf_names.append(entry.name)
+            elif entry.is_dir() and recursive:
+                subdirs.append(entry.path)
+    pdf_names.sort()
+    subdirs.sort()
+    return taken, pdf_names, subdirs
+
+
+def plan_directory(renamer, dir_path, recursive):
+    """Plan one directory; returns (records, subdirs) like scan_directory."""
+    taken, pdf_names, subdirs = scan_directory(dir_path, recursive)
+    records = [renamer.plan_entry(dir_path, name, taken) for name in pdf_names]
+    return records, subdirs
+
+
+def plan_tree(renamer, directory, recursive=False, executor=None):
+    """Yield plan records for every PDF under directory.
+
+    Without an executor this is renamer.iter_plan. With one, every
+    directory is its own task on the pool, so idle workers pick up
+    subdirectories as soon as they are discovered, and records arrive
+    directory by directory in completion order.
+    """
+    if executor is None:
+        yield from renamer.iter_plan(directory, recursive)
+        return
+
+    pending = {executor.submit(plan_directory, renamer, directory, recursive)}
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            records, subdirs = future.result()
+            for subdir in subdirs:
+                pending.add(executor.submit(plan_directory, renamer, subdir, recursive))
+            yield from records
+
+
+def apply_renames(renames, executor=None, progress=None):
+    """Rename every (key, source, target) item and return the success count.
+
+    Each successful rename appends its key to the progress file, if given.
+    Renames are independent once planned, so with an executor they run on
+    the pool in bounded batches.
+    """
+    lock = threading.Lock()
+
+    def rename(item):
+        key, source, target = item
+        if not rename_path(source, target):
             return False
+        if progress:
+            with lock:
+                progress.write(f"{key}\n")
+        return True
+
+    if executor is None:
+        return sum(map(rename, renames))
+
+    success_count = 0
+    renames = iter(renames)
+    while True:
+        batch = list(islice(renames, 1024))
+        if not batch:
+            break
+        success_count += sum(executor.map(rename, batch))
+    return success_count
+
+
+def process_directory(renamer, directory, recursive=False, executor=None):
+    """Plan and apply the renames under directory.
+
+    Returns (success_count, total_count).
+    """
+    success_count = 0
+    total_count = 0
+    renames = []
+    for source, target, status in plan_tree(renamer, directory, recursive, executor):
+        total_count += 1
+        if status == 'skip':
+            success_count += 1
+        elif status == 'rename':
+            renames.append((None, source, target))
+    success_count += apply_renames(renames, executor)
+    return success_count, total_count
+
+
+def write_manifest(records, manifest_path, root):
+    """Stream the planned renames to a JSONL manifest.
+
+    The first line is a header holding the absolute root; every other line
+    is a compact [directory, source name, target name] array with the
+    directory relative to the root. Returns (renames, skipped, errors).
+    """
+    root = os.path.abspath(root)
+    encode = json.JSONEncoder(ensure_ascii=False).encode
+    counts = {'rename': 0, 'skip': 0, 'error': 0}
+    relative_dirs = {}
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        f.write(json.dumps({'version': MANIFEST_VERSION, 'root': root}) + '\n')
+        for source, target, status in records:
+            counts[status] += 1
+            if status != 'rename':
+                continue
+            directory, source_name = os.path.split(source)
+            relative_dir = relative_dirs.get(directory)
+            if relative_dir is None:
+                relative_dir = relative_dirs[directory] = os.path.relpath(directory, root)
+            f.write(encode([relative_dir, source_name, os.path.basename(target)]) + '\n')
+    return counts['rename'], counts['skip'], counts['error']
+
+
+def read_manifest(manifest_path):
+    """Yield (line_number, source, target) for every rename in a manifest."""
+    with open(manifest_path, encoding='utf-8') as f:
+        header = json.loads(next(f))
+        if header.get('version') != MANIFEST_VERSION:
+            raise ValueError(f"Unsupported manifest version: {header.get('version')}")
+        root = header['root']
+        for line_number, line in enumerate(f, 2):
+            directory, source, target = json.loads(line)
+            directory = os.path.join(root, directory)
+            yield line_number, os.path.join(directory, source), os.path.join(directory, target)
+
+
+def read_progress(progress_path):
+    """Return the set of manifest line numbers that are currently applied.
+
+    The progress file is an append-only log of line numbers, negated when a
+    rename is undone. A torn last line from a crash is ignored.
+    """
+    applied = set()
+    if not os.path.exists(progress_path):
+        return applied
+    with open(progress_path, encoding='utf-8') as f:
+        for line in f:
+            if not line.endswith('\n'):
+                break
+            line_number = int(line)
+            if line_number > 0:
+                applied.add(line_number)
+            else:
+                applied.discard(-line_number)
+    return applied
+
+
+def apply_manifest(manifest_path, executor=None):
+    """Apply a manifest, resuming after the renames already logged as done.
+
+    Returns (success_count, total_count).
+    """
+    progress_path = manifest_path + '.progress'
+    applied = read_progress(progress_path)
+    total_count = 0
+    pending = []
+    for line_number, source, target in read_manifest(manifest_path):
+        total_count += 1
+        if line_number not in applied:
+            pending.append((line_number, source, target))
+    if applied:
+        print(f"Resuming: {total_count - len(pending)} renames already applied")
+
+    with open(progress_path, 'a', encoding='utf-8', buffering=1) as progress:
+        success_count = apply_renames(pending, executor, progress)
+    return success_count + total_count - len(pending), total_count
+
+
+def undo_manifest(manifest_path, executor=None):
+    """Rename every applied entry of a manifest back to its source name.
+
+    Returns (success_count, total_count).
+    """
+    progress_path = manifest_path + '.progress'
+    applied = read_progress(progress_path)
+    undo = [(-line_number, target, source)
+            for line_number, source, target in read_manifest(manifest_path)
+            if line_number in applied]
+    undo.reverse()
+
+    with open(progress_path, 'a', encoding='utf-8', buffering=1) as progress:
+        success_count = apply_renames(undo, executor, progress)
+    return success_count, len(undo)
+
+
+def parse_tingkatan(value):
+    """Turn SD/SMP/SMA into the suffix appended to the olympiad type."""
+    tingkatan = value.strip().upper()
+    if tingkatan not in ["SD", "SMP", "SMA"]:
+        raise ValueError(f"Tingkatan yang dimasukkan tidak valid: {value}")
+    if tingkatan == "SMA":
+        return ""
+    return " " + tingkatan
+
+
+def read_batch_config(config_path):
+    """Read a {"directories": {"path": "SD/SMP/SMA", ...}} batch config.
+
+    Relative paths are resolved against the config file's directory.
+    Returns a list of (directory, tingkatan suffix) pairs.
+    """
+    with open(config_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if not isinstance(data.get('directories'), dict):
+        raise ValueError("Batch config must contain a 'directories' object")
+
+    base_dir = os.path.dirname(os.path.abspath(config_path))
+    return [(os.path.join(base_dir, directory), parse_tingkatan(tingkatan))
+            for directory, tingkatan in data['directories'].items()]
+
+
+def run_batch(config_path, recursive=False, executor=None, cache_path=None):
+    """Rename every directory of a batch config in this process.
+
+    All renamers share the compiled RuleMatcher, the worker pool and the
+    cache file. Prints throughput and success counts per directory.
+    """
+    try:
+        directories = read_batch_config(config_path)
+    except (OSError, ValueError) as e:
+        print(f"Error reading batch config '{config_path}': {e}")
+        return
+    success_count = 0
+    total_count = 0
+    failed_directories = 0
+    caches = {}
+    start = time.perf_counter()
+
+    try:
+        for directory, tingkatan in directories:
+            renamer = OlympiadRenamer(tingkatan)
+            if cache_path:
+                if tingkatan not in caches:
+                    caches[tingkatan] = ClassificationCache(cache_path, renamer.ruleset_hash())
+                renamer.cache = caches[tingkatan]
+
+            print(f"Processing {directory}...")
+            directory_start = time.perf_counter()
+            try:
+                successes, total = process_directory(renamer, directory, recursive, executor)
+            except OSError as e:
+                # e.g. a missing or unreadable directory; the others still run
+                failed_directories += 1
+                print(f"{directory}: Error: {e}")
+                continue
+            elapsed = time.perf_counter() - directory_start
+            success_count += successes
+            total_count += total
+            print(f"{directory}: {successes}/{total} files in {elapsed:.2f}s "
+                  f"({total / elapsed if elapsed else 0:.0f} files/sec)")
+
+        elapsed = time.perf_counter() - start
+        print("\nBatch complete!")
+        print(f"Successfully processed: {success_count}/{total_count} files in {len(directories)} "
+              f"directories ({total_count / elapsed if elapsed else 0:.0f} files/sec)")
+        if failed_directories:
+            print(f"{failed_directories} of {len(directories)} directories could not be processed")
+    finally:
+        # Keep the classifications of the directories that did run
+        for tingkatan, cache in caches.items():
+            print(f"{tingkatan.strip() or 'SMA'} {cache.stats()}")
+            cache.close()
+
 
 def main():
     parser = argparse.ArgumentParser(description='Rename Olympiad PDF files to standard format')
@@ -218,47 +850,80 @@ def main():
                       help='Directory containing files to rename (default: current directory)')
     parser.add_argument('-r', '--recursive', action='store_true',
                       help='Process subdirectories recursively')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                      help='Scan, classify and rename with N worker threads (default: 1)')
+    parser.add_argument('-t', '--tingkatan', choices=['SD', 'SMP', 'SMA'], type=str.upper,
+                      help='Tingkatan to use instead of asking interactively')
+    parser.add_argument('--cache', metavar='PATH',
+                      help='SQLite file caching classifications across runs')
+    # A batch config renames for real, so it cannot be combined with a dry run
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--config', metavar='FILE',
+                      help='JSON batch config mapping directories to tingkatan')
+    mode.add_argument('--plan', metavar='MANIFEST',
+                      help='Only write the planned renames to a JSONL manifest (dry run)')
+    mode.add_argument('--apply', metavar='MANIFEST',
+                      help='Apply a manifest written by --plan, resuming an interrupted run')
+    mode.add_argument('--undo', metavar='MANIFEST',
+                      help='Rename the applied entries of a manifest back to their old names')
     args = parser.parse_args()
 
+    executor = ThreadPoolExecutor(max_workers=args.jobs) if args.jobs > 1 else None
+    try:
+        run(args, executor)
+    finally:
+        if executor:
+            executor.shutdown()
+
+
+def run(args, executor):
+    if args.apply or args.undo:
+        if args.apply:
+            success_count, total_count = apply_manifest(args.apply, executor)
+        else:
+            success_count, total_count = undo_manifest(args.undo, executor)
+        print("\nProcessing complete!")
+        print(f"Successfully processed: {success_count}/{total_count} files")
+        return
+
+    if args.config:
+        run_batch(args.config, args.recursive, executor, args.cache)
+        return
+
     renamed_dir = os.path.join(args.directory, 'renamed')
     if not os.path.isdir(renamed_dir):
         os.makedirs(renamed_dir)
     args.directory = renamed_dir
 
-    tingkatan_input = True
-    tingkatan = ""
-    while tingkatan_input:
-        tingkatan = input("Masukkan Tingkatan (SD/SMP/SMA): ")
-        tingkatan = tingkatan.upper()
-        if tingkatan not in ["SD", "SMP", "SMA"]:
-            print("Tingkatan yang dimasukkan tidak valid.")
-        else:
-            if tingkatan == "SMA":
-                tingkatan = ""
-            else:
-                tingkatan = " " + tingkatan
-            tingkatan_input = False
+    if args.tingkatan:
+        tingkatan = parse_tingkatan(args.tingkatan)
+    else:
+        while True:
+            try:
+                tingkatan = parse_tingkatan(input("Masukkan Tingkatan (SD/SMP/SMA): "))
+                break
+            except ValueError:
+                print("Tingkatan yang dimasukkan tidak valid.")
     
     renamer = OlympiadRenamer(tingkatan)
-    success_count = 0
-    total_count = 0
-
-    print("Processing files...")
-    
-    def process_directory(dir_path):
-        nonlocal success_count, total_count
-        for entry in os.scandir(dir_path):
-            if entry.is_file() and entry.name.lower().endswith('.pdf'):
-                total_count += 1
-                if renamer.process_file(entry.path):
-                    success_count += 1
-            elif entry.is_dir() and args.recursive:
-                process_directory(entry.path)
+    if args.cache:
+        renamer.cache = ClassificationCache(args.cache, renamer.ruleset_hash())
 
-    process_directory(args.directory)
+    if args.plan:
+        print("Planning renames...")
+        records = plan_tree(renamer, args.directory, args.recursive, executor)
+        renames, skipped, errors = write_manifest(records, args.plan, args.directory)
+        print(f"\nPlanned {renames} renames ({skipped} already correct, {errors} errors) in {args.plan}")
+    else:
+        print("Processing files...")
+        success_count, total_count = process_directory(
+            renamer, args.directory, args.recursive, executor)
+        print("\nProcessing complete!")
+        print(f"Successfully processed: {success_count}/{total_count} files")
 
-    print("\nProcessing complete!")
-    print(f"Successfully processed: {success_count}/{total_count} files")
+    if renamer.cache:
+        print(renamer.cache.stats())
+        renamer.cache.close()
 
 if __name__ == '__main__':
     main()
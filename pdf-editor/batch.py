@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+import os
+import io
+import sys
+import glob
+import json
+import time
+import argparse
+import importlib.util
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import redirect_stdout
+from datetime import datetime
+
+import fitz  # PyMuPDF
+
+
+def run_split(module, task):
+    split_pages = [int(page) for page in task['args'].split(',')] if task['args'] else []
+    return module.split_pdf(task['path'], split_pages, task['folder'])
+
+def run_hf_remover(module, task):
+    return module.remove_header_footer(task['path'], task['folder'])
+
+def run_extract_images(module, task):
+    prefix = os.path.splitext(os.path.basename(task['path']))[0]
+    return module.extract_images(task['path'], task['folder'], prefix,
+                                 passthrough=task['args'] == 'passthrough')
+
+def run_extract_images_auto(module, task):
+    return module.extract_images_auto(task['path'], task['folder'])
+
+def run_extract_images_cv(module, task):
+    results = module.extract_page_range(task['path'], task['start'], task['stop'], task['folder'])
+    return sum(len(filenames) for filenames, _ in results)
+
+def run_extract_questions(module, task):
+    with fitz.open(task['path']) as pdf_document:
+        return sum(len(module.extract_question_page(pdf_document, page_num, task['folder']))
+                   for page_num in range(task['start'], task['stop']))
+
+# Operation name: (script, runs on page ranges, runner)
+OPERATIONS = {
+    'split': ('split.py', False, run_split),
+    'hf-remover': ('hf-remover.py', False, run_hf_remover),
+    'extract-images': ('extract-images.py', False, run_extract_images),
+    'extract-images-auto': ('extract-images-auto.py', False, run_extract_images_auto),
+    'extract-images-cv': ('extract-images-cv.py', True, run_extract_images_cv),
+    'extract-questions-cv': ('extract-questions-cv.py', True, run_extract_questions),
+}
+
+_tools = {}
+
+def load_tool(operation):
+    """Import the script behind an operation once per process."""
+    if operation not in _tools:
+        script = OPERATIONS[operation][0]
+        path = os.path.join(os.path.dirname(os.path.abspath(__file__)), script)
+        spec = importlib.util.spec_from_file_location(script[:-3].replace('-', '_'), path)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[spec.name] = module
+        spec.loader.exec_module(module)
+        _tools[operation] = module
+    return _tools[operation]
+
+def load_tools(operations):
+    """Pool initializer: pay the NumPy/OpenCV/PyMuPDF imports once per worker."""
+    for operation in operations:
+        load_tool(operation)
+
+def run_task(task):
+    """Run one operation on a document or page range, with its output captured."""
+    started = time.perf_counter()
+    output = io.StringIO()
+    error = None
+    try:
+        with redirect_stdout(output):
+            result = OPERATIONS[task['op']][2](load_tool(task['op']), task)
+        if result is False:
+            # The scripts report their errors on stdout and return False
+            lines = output.getvalue().strip().splitlines()
+            error = lines[-1] if lines else 'failed'
+    except Exception as e:
+        error = str(e)
+    return {**task, 'seconds': time.perf_counter() - started, 'error': error}
+
+def find_pdfs(inputs):
+    """PDFs in the given directories (recursively), glob patterns and files, in order."""
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            for dir_path, dir_names, file_names in os.walk(item):
+                dir_names.sort()
+                paths.extend(os.path.join(dir_path, name) for name in sorted(file_names)
+                             if name.lower().endswith('.pdf'))
+        else:
+            paths.extend(sorted(path for path in glob.glob(item, recursive=True)
+                                if os.path.isfile(path)))
+    return list(dict.fromkeys(os.path.abspath(path) for path in paths))
+
+def parse_operation(value):
+    """'name' or 'name:args', e.g. 'split:5,10' or 'extract-images:passthrough'."""
+    name, _, args = value.partition(':')
+    if name not in OPERATIONS:
+        raise argparse.ArgumentTypeError(f"unknown operation '{name}', expected one of "
+                                         f"{', '.join(OPERATIONS)}")
+    return name, args
+
+def document_folders(paths):
+    """A separate output folder name per document, numbered when names repeat."""
+    folders = {}
+    taken = set()
+    for path in paths:
+        name = os.path.splitext(os.path.basename(path))[0]
+        folder, n = name, 1
+        while folder in taken:
+            folder = f"{name} ({n})"
+            n += 1
+        taken.add(folder)
+        folders[path] = folder
+    return folders
+
+def plan_tasks(paths, operations, output_dir, pages_per_task):
+    """One task per document, or per page range for page operations.
+
+    Returns (tasks, page counts, documents that could not be opened).
+    """
+    page_counts = {}
+    unreadable = {}
+    for path in paths:
+        try:
+            with fitz.open(path) as pdf_document:
+                page_counts[path] = len(pdf_document)
+        except Exception as e:
+            unreadable[path] = str(e)
+    folders = document_folders(page_counts)
+
+    tasks = []
+    for path, page_count in page_counts.items():
+        for operation, args in operations:
+            folder = os.path.join(output_dir, operation, folders[path])
+            os.makedirs(folder, exist_ok=True)
+            task = {'op': operation, 'args': args, 'path': path, 'folder': folder,
+                    'start': 0, 'stop': page_count}
+            if not OPERATIONS[operation][1]:
+                tasks.append(task)
+                continue
+            for start in range(0, page_count, pages_per_task):
+                tasks.append({**task, 'start': start,
+                              'stop': min(start + pages_per_task, page_count)})
+    # Long tasks first, so the pool does not end waiting on one big document
+    tasks.sort(key=lambda task: task['stop'] - task['start'], reverse=True)
+    return tasks, page_counts, unreadable
+
+def summarise(results, page_counts, output_dir, elapsed):
+    """Per-operation throughput and failures of a batch run."""
+    report = {}
+    for result in results:
+        entry = report.setdefault(result['op'], {'tasks': 0, 'documents': set(), 'pages': 0,
+                                                 'failed_tasks': 0, 'busy_seconds': 0.0})
+        entry['tasks'] += 1
+        entry['documents'].add(result['path'])
+        entry['pages'] += result['stop'] - result['start']
+        entry['failed_tasks'] += result['error'] is not None
+        entry['busy_seconds'] += result['seconds']
+    for operation, entry in report.items():
+        entry['documents'] = len(entry['documents'])
+        entry['outputs'] = sum(len(files) for _, _, files in
+                               os.walk(os.path.join(output_dir, operation)))
+    pages = sum(page_counts.values())
+    page_operations = sum(entry['pages'] for entry in report.values())
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'elapsed': elapsed,
+        'documents': len(page_counts),
+        'pages': pages,
+        'pages_per_sec': pages / elapsed if elapsed else None,
+        'page_operations': page_operations,
+        'page_operations_per_sec': page_operations / elapsed if elapsed else None,
+        'operations': report,
+    }
+
+def run_batch(inputs, operations, output_dir="batch-output", jobs=None, pages_per_task=8,
+              report_path=None):
+    started = time.perf_counter()
+    paths = find_pdfs(inputs)
+    if not paths:
+        print("No PDF files found")
+        return False
+    names = [name for name, _ in operations]
+    # Imported here first: a missing dependency fails before any work starts,
+    # and forked workers inherit the loaded modules
+    try:
+        load_tools(names)
+    except ImportError as e:
+        print(f"Error: {str(e)}")
+        return False
+
+    tasks, page_counts, unreadable = plan_tasks(paths, operations, output_dir, pages_per_task)
+    for path, error in unreadable.items():
+        print(f"Skipping unreadable PDF {path}: {error}")
+    total_pages = sum(page_counts.values())
+    print(f"{len(page_counts)} PDFs, {total_pages} pages, {len(tasks)} tasks "
+          f"on {jobs or os.cpu_count()} workers")
+
+    results = []
+    pages_done = 0
+    last_report = 0.0
+    with ProcessPoolExecutor(jobs, initializer=load_tools, initargs=(names,)) as executor:
+        futures = [executor.submit(run_task, task) for task in tasks]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            pages_done += result['stop'] - result['start']
+            now = time.perf_counter()
+            if result['error']:
+                print(f"Failed: {result['op']} on {os.path.basename(result['path'])} "
+                      f"(pages {result['start'] + 1}-{result['stop']}): {result['error']}")
+            if now - last_report >= 1 or len(results) == len(tasks):
+                last_report = now
+                print(f"[{len(results)}/{len(tasks)} tasks] "
+                      f"{pages_done / (now - started):.1f} pages/sec over all operations")
+
+    report = summarise(results, page_counts, output_dir, time.perf_counter() - started)
+    report['unreadable'] = unreadable
+    report['failures'] = [{'op': r['op'], 'document': r['path'], 'pages': [r['start'] + 1, r['stop']],
+                           'error': r['error']} for r in results if r['error']]
+    report_path = report_path or os.path.join(output_dir, 'batch-report.json')
+    with open(report_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+
+    print(f"\nProcessed {report['documents']} PDFs ({report['pages']} pages) in "
+          f"{report['elapsed']:.1f}s, {report['pages_per_sec']:.1f} pages/sec "
+          f"({report['page_operations_per_sec']:.1f} over all operations)")
+    for operation, entry in report['operations'].items():
+        print(f"{operation:>21}: {entry['documents']} PDFs, {entry['outputs']} files written, "
+              f"{entry['failed_tasks']} of {entry['tasks']} tasks failed, "
+              f"{entry['busy_seconds']:.1f}s of worker time")
+    print(f"Report written to {report_path}")
+    return not report['failures'] and not unreadable
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description='Run pdf-editor tools over many PDFs with one pool of worker processes',
+        epilog=f"Operations: {', '.join(OPERATIONS)}. split takes the pages to split after "
+               f"(split:5,10); extract-images takes passthrough (extract-images:passthrough).")
+    parser.add_argument('inputs', nargs='+',
+                        help='Directories (searched recursively), glob patterns or PDF files')
+    parser.add_argument('--op', dest='operations', action='append', type=parse_operation,
+                        required=True, metavar='NAME[:ARGS]',
+                        help='Operation to run on every PDF; repeat for several')
+    parser.add_argument('-o', '--output-dir', default='batch-output',
+                        help='Outputs go to <output-dir>/<operation>/<pdf name>/ (default: batch-output)')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help=f'Worker processes (default: {os.cpu_count()}, the core count)')
+    parser.add_argument('--pages-per-task', type=int, default=8,
+                        help='Pages per task for the page-based operations (default: 8)')
+    parser.add_argument('--report', metavar='PATH',
+                        help='Where to write the JSON report (default: <output-dir>/batch-report.json)')
+    args = parser.parse_args()
+
+    success = run_batch(args.inputs, args.operations, args.output_dir, args.jobs,
+                        args.pages_per_task, args.report)
+    sys.exit(0 if success else 1)
@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+import os
+import io
+import sys
+import shutil
+import argparse
+import tempfile
+import tracemalloc
+import importlib.util
+import time
+from contextlib import redirect_stdout
+
+import cv2
+import fitz  # PyMuPDF
+import numpy as np
+from PIL import Image
+
+
+def load_script(name):
+    """Import one of the hyphenated pdf-editor scripts as a module."""
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), name)
+    spec = importlib.util.spec_from_file_location(name[:-3].replace('-', '_'), path)
+    module = importlib.util.module_from_spec(spec)
+    # Registered so worker processes can unpickle its functions
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def picture(rng, width, height):
+    """A photo-like PNG: a smooth gradient with shapes and a little noise."""
+    y, x = np.mgrid[0:height, 0:width]
+    image = np.stack([(x * 255 // width), (y * 255 // height),
+                      np.full((height, width), rng.integers(0, 256))], axis=-1).astype(np.int16)
+    for _ in range(4):
+        cx, cy, r = rng.integers(0, width), rng.integers(0, height), rng.integers(10, 40)
+        image[(x - cx) ** 2 + (y - cy) ** 2 < r * r] = rng.integers(0, 256, 3)
+    image += rng.integers(-12, 13, image.shape)
+    buffer = io.BytesIO()
+    Image.fromarray(np.clip(image, 0, 255).astype(np.uint8)).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def make_pdf(path, pages, pictures_per_page=2, seed=0):
+    """Write a test compilation: numbered questions with a few figures per page."""
+    rng = np.random.default_rng(seed)
+    document = fitz.open()
+    for page_num in range(pages):
+        page = document.new_page(width=595, height=842)
+        for line in range(40):
+            page.insert_text((50, 60 + line * 19),
+                             f"{page_num * 40 + line + 1}. Tentukan nilai x yang memenuhi "
+                             f"persamaan {line + 2}x + {page_num + 3} = {line * 7 + 11}.",
+                             fontsize=9)
+        for index in range(pictures_per_page):
+            left = 60 + index * 260
+            top = 120 + int(rng.integers(0, 500))
+            page.insert_image(fitz.Rect(left, top, left + 200, top + 150),
+                              stream=picture(rng, 400, 300))
+    document.save(path)
+    document.close()
+
+
+def dense_page(rng, width=1190, height=1684, cell=64, strokes=12):
+    """A scanned page (2x render size) packed with small figures and text blocks.
+
+    Every grid cell holds one block and a few long strokes join some of
+    them, so the page yields hundreds of candidate regions for
+    detect_images_in_page to score, many of them overlapping.
+    """
+    page = np.full((height, width, 3), 240, np.int16)
+    for top in range(0, height - cell, cell):
+        for left in range(0, width - cell, cell):
+            w, h = rng.integers(cell - 14, cell - 6, 2)
+            if rng.random() < 0.3:
+                # Text-like block: dark marks on white
+                block = np.where(rng.random((h, w, 1)) < 0.35, 20, 250)
+            else:
+                gradient = np.linspace(rng.integers(0, 128), rng.integers(128, 256), w)
+                block = gradient[None, :, None] + rng.integers(-40, 41, (h, w, 3))
+            page[top + 4:top + 4 + h, left + 4:left + 4 + w] = block
+    # Diagram strokes across the blocks give large candidates overlapping many others
+    page = np.clip(page, 0, 255).astype(np.uint8)
+    for _ in range(strokes):
+        points = rng.integers(0, (width, height), (3, 2)).astype(np.int32)
+        cv2.polylines(page, [points], False, (30, 30, 30), 5)
+    page = page.astype(np.int16)
+    # Scanner noise
+    page += rng.integers(-3, 4, page.shape)
+    return np.clip(page, 0, 255).astype(np.uint8)
+
+
+def bench_region_scoring(pages, seed=0):
+    """Compare per-crop and batched region scoring on dense pages.
+
+    Reports how often the two disagree and how long the detection and the
+    scoring step alone take with each, next to one Canny pass over the
+    whole page: the edge test has to read every candidate pixel once.
+    """
+    module = load_script('extract-images-cv.py')
+    rng = np.random.default_rng(seed)
+    images = [dense_page(rng) for _ in range(pages)]
+    totals = {'per-crop': 0.0, 'batched': 0.0}
+    scoring = {'per-crop': 0.0, 'batched': 0.0}
+    candidates = disagreements = 0
+    canny = 0.0
+    for image in images:
+        for label, batched in (('per-crop', False), ('batched', True)):
+            start = time.perf_counter()
+            module.detect_images_in_page(image, batched=batched)
+            totals[label] += time.perf_counter() - start
+
+        # The candidates detect_images_in_page scores, to time that step alone
+        boxes = candidate_boxes(module, image)
+        candidates += len(boxes)
+        start = time.perf_counter()
+        per_crop = [module.score_region(image, box) for box in boxes]
+        scoring['per-crop'] += time.perf_counter() - start
+        start = time.perf_counter()
+        batched = module.score_regions(image, boxes)
+        scoring['batched'] += time.perf_counter() - start
+        disagreements += sum(a != b for a, b in zip(per_crop, batched))
+        start = time.perf_counter()
+        cv2.Canny(image, 50, 150)
+        canny += time.perf_counter() - start
+
+    print(f"{pages} dense pages, {candidates} candidate regions, "
+          f"{disagreements} decisions differ ({disagreements / max(candidates, 1):.2%})")
+    for label in totals:
+        print(f"{label:>9}: detect {totals[label] / pages * 1000:8.1f} ms/page, "
+              f"scoring {scoring[label] / pages * 1000:8.1f} ms/page "
+              f"({scoring[label] / totals[label]:.0%} of detect)")
+    print(f"    Canny: {canny / pages * 1000:8.1f} ms/page over the whole page")
+    print(f"  speedup: detect {totals['per-crop'] / totals['batched']:.2f}x, "
+          f"scoring {scoring['per-crop'] / scoring['batched']:.1f}x")
+    return {'candidates': candidates, 'disagreements': disagreements,
+            'detect': totals, 'scoring': scoring, 'canny': canny}
+
+
+def candidate_boxes(module, image):
+    """The boxes detect_images_in_page passes to scoring, via a recording score_regions."""
+    recorded = []
+    original = module.score_regions
+    module.score_regions = lambda page_image, boxes: recorded.extend(boxes) or [False] * len(boxes)
+    try:
+        module.detect_images_in_page(image, batched=True)
+    finally:
+        module.score_regions = original
+    return recorded
+
+
+def output_names(folder):
+    return sorted(os.listdir(folder))
+
+
+def bench_cv_scaling(pdf_path, jobs_list, scratch_dir):
+    """Time extract_images_cv for each --jobs value and check the outputs match."""
+    module = load_script('extract-images-cv.py')
+    with fitz.open(pdf_path) as document:
+        pages = len(document)
+    baseline = None
+    results = []
+    for jobs in jobs_list:
+        output_folder = tempfile.mkdtemp(prefix=f'cv-jobs{jobs}-', dir=scratch_dir)
+        try:
+            start = time.perf_counter()
+            with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+                module.extract_images_cv(pdf_path, output_folder, jobs=jobs)
+            elapsed = time.perf_counter() - start
+            names = output_names(output_folder)
+        finally:
+            shutil.rmtree(output_folder)
+        if baseline is None:
+            baseline = (names, elapsed)
+        elif names != baseline[0]:
+            raise AssertionError(f"--jobs {jobs} wrote different files than --jobs {jobs_list[0]}")
+        results.append({'jobs': jobs, 'seconds': elapsed, 'pages_per_sec': pages / elapsed,
+                        'images': len(names)})
+        print(f"jobs {jobs:>3}: {elapsed:8.2f}s, {pages / elapsed:7.1f} pages/sec, "
+              f"{len(names)} images, speedup {baseline[1] / elapsed:5.2f}x")
+    return results
+
+
+def bench_auto(pdf_path, scratch_dir):
+    """Compare rendering every page (extract-images-cv.py) with extract-images-auto.py."""
+    results = {}
+    for label, script, function in (('cv', 'extract-images-cv.py', 'extract_images_cv'),
+                                    ('auto', 'extract-images-auto.py', 'extract_images_auto')):
+        extract = getattr(load_script(script), function)
+        output_folder = tempfile.mkdtemp(prefix=f'{label}-', dir=scratch_dir)
+        try:
+            start = time.perf_counter()
+            with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+                extract(pdf_path, output_folder)
+            elapsed = time.perf_counter() - start
+            images = len(os.listdir(output_folder))
+        finally:
+            shutil.rmtree(output_folder)
+        results[label] = elapsed
+        print(f"{label:>5}: {elapsed:8.2f}s, {images} images")
+    print(f"speedup: {results['cv'] / results['auto']:.1f}x")
+    return results
+
+
+def make_photo_pdf(path, pages, seed=0):
+    """Write a PDF of large JPEG photos, one per page, each also shown as a small logo."""
+    rng = np.random.default_rng(seed)
+    document = fitz.open()
+    logo = None
+    for page_num in range(pages):
+        buffer = io.BytesIO()
+        Image.open(io.BytesIO(picture(rng, 2400, 1800))).convert('RGB').save(buffer, 'JPEG')
+        page = document.new_page(width=595, height=842)
+        page.insert_image(fitz.Rect(50, 100, 545, 471), stream=buffer.getvalue())
+        if logo is None:
+            logo = page.insert_image(fitz.Rect(50, 30, 90, 60), stream=picture(rng, 200, 150))
+        else:
+            page.insert_image(fitz.Rect(50, 30, 90, 60), xref=logo)
+    document.save(path)
+    document.close()
+
+
+def bench_passthrough(pdf_path, scratch_dir):
+    """Time and trace extract-images.py with and without --passthrough."""
+    module = load_script('extract-images.py')
+    results = {}
+    for passthrough in (False, True):
+        output_folder = tempfile.mkdtemp(prefix='passthrough-', dir=scratch_dir)
+        try:
+            tracemalloc.start()
+            start = time.perf_counter()
+            with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+                module.extract_images(pdf_path, output_folder, 'image', passthrough=passthrough)
+            elapsed = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            images = len(os.listdir(output_folder))
+        finally:
+            shutil.rmtree(output_folder)
+        label = 'passthrough' if passthrough else 'decode'
+        results[label] = elapsed
+        print(f"{label:>11}: {elapsed:8.2f}s, {images} images, "
+              f"peak {peak / 2**20:7.1f} MiB traced (NumPy, not PIL)")
+    print(f"    speedup: {results['decode'] / results['passthrough']:.1f}x")
+    return results
+
+
+def bench_image_index(size, scratch_dir, queries=2000, seed=0):
+    """Lookups in an ImageIndex of size images against a NumPy linear scan."""
+    from image_index import ImageIndex
+    rng = np.random.default_rng(seed)
+    hashes = rng.integers(0, 2**64, size, dtype=np.uint64)
+    path = os.path.join(scratch_dir, 'image-index.sqlite')
+    index = ImageIndex(path)
+    start = time.perf_counter()
+    for number, value in enumerate(hashes.tolist()):
+        index.add(value, f'/images/{number}.png')
+    index.close()
+    build = time.perf_counter() - start
+    start = time.perf_counter()
+    index = ImageIndex(path)
+    load = time.perf_counter() - start
+
+    # Half near-duplicates of indexed images, half unrelated images
+    probes = []
+    for number in range(queries):
+        value = int(hashes[rng.integers(size)])
+        if number % 2:
+            value = int(rng.integers(0, 2**64, dtype=np.uint64))
+        else:
+            for bit in rng.choice(64, rng.integers(0, 5), replace=False):
+                value ^= 1 << int(bit)
+        probes.append(value)
+
+    # find() checks the file still exists; there are no files here
+    exists, os.path.exists = os.path.exists, lambda path: True
+    try:
+        start = time.perf_counter()
+        found = sum(index.find(value) is not None for value in probes)
+        indexed = (time.perf_counter() - start) / queries
+    finally:
+        os.path.exists = exists
+    index.close()
+
+    popcount = np.array([bin(byte).count('1') for byte in range(256)], np.uint8)
+    start = time.perf_counter()
+    for value in probes[:50]:
+        distances = popcount[(hashes ^ np.uint64(value)).view(np.uint8)].reshape(-1, 8).sum(axis=1)
+        distances.min()
+    linear = (time.perf_counter() - start) / 50
+
+    print(f"{size} images: build {build:.1f}s, load {load:.1f}s, {found} of {queries} probes matched")
+    print(f"  multi-index: {indexed * 1e6:8.1f} us/lookup")
+    print(f"  linear scan: {linear * 1e6:8.1f} us/lookup (NumPy), {linear / indexed:.0f}x slower")
+    return {'build': build, 'load': load, 'indexed': indexed, 'linear': linear}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the pdf-editor image extractors')
+    parser.add_argument('pdf', nargs='?',
+                        help='PDF to run on (default: a generated compilation)')
+    parser.add_argument('--pages', type=int, default=60,
+                        help='Pages of the generated compilation (default: 60)')
+    parser.add_argument('--jobs', default=None,
+                        help='Comma separated --jobs values for extract-images-cv.py '
+                             '(default: 1,2,4,... up to the core count)')
+    parser.add_argument('--dense-pages', type=int, default=10,
+                        help='Noisy dense pages for the region scoring comparison (default: 10)')
+    parser.add_argument('--photo-pages', type=int, default=10,
+                        help='Pages of large JPEG photos for the passthrough comparison (default: 10)')
+    parser.add_argument('--index-size', type=int, default=300000,
+                        help='Images in the dedup index lookup comparison (default: 300000)')
+    parser.add_argument('--scratch-dir', default='/dev/shm' if os.path.isdir('/dev/shm') else None,
+                        help='Directory for generated files and outputs (default: /dev/shm)')
+    args = parser.parse_args()
+
+    if args.jobs:
+        jobs_list = [int(jobs) for jobs in args.jobs.split(',')]
+    else:
+        jobs_list = [1]
+        while jobs_list[-1] * 2 <= (os.cpu_count() or 1):
+            jobs_list.append(jobs_list[-1] * 2)
+
+    work_dir = tempfile.mkdtemp(prefix='pdf-editor-bench-', dir=args.scratch_dir)
+    try:
+        pdf_path = args.pdf
+        if not pdf_path:
+            pdf_path = os.path.join(work_dir, 'compilation.pdf')
+            make_pdf(pdf_path, args.pages)
+            print(f"Generated a {args.pages}-page compilation")
+        print(f"\nextract-images-cv.py on {os.cpu_count()} cores:")
+        bench_cv_scaling(pdf_path, jobs_list, work_dir)
+        print("\nEmbedded images first (auto) vs rendering every page (cv):")
+        bench_auto(pdf_path, work_dir)
+        print("\nextract-images.py on large JPEG photos:")
+        photo_path = os.path.join(work_dir, 'photos.pdf')
+        make_photo_pdf(photo_path, args.photo_pages)
+        bench_passthrough(photo_path, work_dir)
+        print("\nImage dedup index:")
+        bench_image_index(args.index_size, work_dir)
+        print("\nRegion scoring in detect_images_in_page:")
+        bench_region_scoring(args.dense_pages)
+    finally:
+        shutil.rmtree(work_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+import os
+import sys
+import argparse
+import importlib.util
+import fitz  # PyMuPDF
+
+# Filters whose stream is already a complete image file
+PASSTHROUGH = {'/DCTDecode': 'jpeg', '/JPXDecode': 'jp2'}
+
+def load_cv_extractor():
+    """Import extract-images-cv.py, used for pages without embedded images."""
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'extract-images-cv.py')
+    spec = importlib.util.spec_from_file_location('extract_images_cv', path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+def embedded_images(page, min_size=10, scan_coverage=0.9):
+    """The usable embedded images of a page as (xref, width, height, rects) tuples.
+
+    Images smaller than min_size pixels, or not drawn anywhere visible on
+    the page, are not usable. A page whose image covers scan_coverage of
+    it is a scan, and has no usable images: the pictures are inside it.
+    """
+    page_area = abs(page.rect)
+    images = []
+    for xref, smask, width, height, *_ in page.get_images(full=True):
+        if width < min_size or height < min_size:
+            continue
+        rects = [rect & page.rect for rect in page.get_image_rects(xref)]
+        rects = [rect for rect in rects if not rect.is_empty]
+        if not rects:
+            continue
+        if any(abs(rect) >= scan_coverage * page_area for rect in rects):
+            return []
+        images.append((xref, width, height, rects))
+    return images
+
+def is_figure(rects, page, min_coverage=0.02):
+    """True if something drawn at rects is big enough to be a figure, not a logo or icon."""
+    return any(abs(rect) >= min_coverage * abs(page.rect) for rect in rects)
+
+def vector_figures(page, min_side=20):
+    """Rects of the clusters of vector drawings on a page that are big enough to be figures.
+
+    Rules, underlines and other thin or small drawings are left out.
+    """
+    return [rect for rect in page.cluster_drawings()
+            if rect.width >= min_side and rect.height >= min_side and is_figure([rect], page)]
+
+def save_embedded_image(pdf_document, xref, output_folder, filename):
+    """Write an image XObject; JPEG and JPEG 2000 streams are copied as they are."""
+    image_filter = pdf_document.xref_get_key(xref, 'Filter')
+    if image_filter[0] == 'name' and image_filter[1] in PASSTHROUGH:
+        ext = PASSTHROUGH[image_filter[1]]
+        image_bytes = pdf_document.xref_stream_raw(xref)
+    else:
+        base_image = pdf_document.extract_image(xref)
+        if not base_image:
+            return None
+        ext = base_image["ext"]
+        image_bytes = base_image["image"]
+    filename = f"{filename}.{ext}"
+    with open(os.path.join(output_folder, filename), 'wb') as f:
+        f.write(image_bytes)
+    return filename
+
+def extract_images_auto(input_pdf_path, output_folder="extracted-images-auto"):
+    try:
+        if not os.path.exists(output_folder):
+            os.makedirs(output_folder)
+
+        cv_extractor = None
+        pdf_document = fitz.open(input_pdf_path)
+        embedded_count = 0
+        detected_count = 0
+        rendered_pages = 0
+        saved_xrefs = set()
+
+        for page_num in range(len(pdf_document)):
+            page = pdf_document[page_num]
+            images = embedded_images(page)
+
+            reused = 0
+            new_figures = 0
+            for img_index, (xref, width, height, rects) in enumerate(images):
+                # An image reused on several pages is written once
+                if xref in saved_xrefs:
+                    reused += 1
+                    continue
+                saved_xrefs.add(xref)
+                filename = save_embedded_image(pdf_document, xref, output_folder,
+                                               f"image_p{page_num+1}_{img_index+1}")
+                if filename:
+                    embedded_count += 1
+                    new_figures += is_figure(rects, page)
+                    print(f"Saved image: {filename} (Size: ({width}, {height}))")
+            if images:
+                print(f"Page {page_num+1}: {len(images)} embedded images"
+                      + (f", {reused} already saved from an earlier page" if reused else ""))
+
+            # Only a page whose pictures are all new embedded figures can skip
+            # rendering: vector drawings, scans, and pages with nothing but a
+            # repeated logo or icons are looked at with OpenCV
+            if new_figures and not vector_figures(page):
+                continue
+            if cv_extractor is None:
+                cv_extractor = load_cv_extractor()
+            # The embedded images are saved already, do not crop them again
+            filenames, region_count = cv_extractor.extract_page(
+                pdf_document, page_num, output_folder,
+                exclude=[rect for *_, rects in images for rect in rects])
+            for filename in filenames:
+                print(f"Extracted: {filename}")
+            detected_count += len(filenames)
+            rendered_pages += 1
+            print(f"Page {page_num+1}: Rendered, found {region_count} other image regions")
+
+        print(f"\nTotal {embedded_count + detected_count} images extracted to {output_folder} "
+              f"({embedded_count} embedded, {detected_count} detected on "
+              f"{rendered_pages} of {len(pdf_document)} rendered pages)")
+        pdf_document.close()
+        return True
+
+    except Exception as e:
+        print(f"Error: {str(e)}")
+        return False
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Extract the images of a PDF: embedded images '
+                                                 'as stored, pictures on other pages with OpenCV')
+    parser.add_argument('input_pdf_path', help='PDF to extract images from')
+    parser.add_argument('-o', '--output-folder', default='extracted-images-auto',
+                        help='Folder to save the images in (default: extracted-images-auto)')
+    args = parser.parse_args()
+
+    extract_images_auto(args.input_pdf_path, args.output_folder)
@@ -2,11 +2,116 @@ import os
 import fitz  # PyMuPDF
 import cv2
 import numpy as np
-import sys
+import argparse
+from concurrent.futures import ProcessPoolExecutor
 from PIL import Image
 import io
 
-def detect_images_in_page(page_image):
+def score_region(page_image, box):
+    """True if the region inside box looks like a picture rather than text or background."""
+    x, y, w, h = box
+    # Analyze region content
+    roi = page_image[y:y+h, x:x+w]
+    
+    # Check for sufficient color variation
+    std_dev = np.std(roi)
+    if std_dev < 20:  # Skip low-variance regions
+        return False
+        
+    # Edge density check
+    edges = cv2.Canny(roi, 50, 150)
+    edge_density = np.sum(edges > 0) / (w * h)
+    if edge_density > 0.4:  # Likely text
+        return False
+    return True
+
+def box_sums(integral, x, y, w, h):
+    """Sums over many boxes at once, from an integral image (one row/column larger)."""
+    return integral[y+h, x+w] - integral[y, x+w] - integral[y+h, x] + integral[y, x]
+
+def overlaps(a, b):
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+def box_groups(shape, boxes):
+    """Rectangles (x0, y0, x1, y1) around the groups of overlapping boxes; no two overlap."""
+    mask = np.zeros(shape[:2], np.uint8)
+    for x, y, w, h in boxes:
+        mask[y:y+h, x:x+w] = 1
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    groups = []
+    for contour in contours:
+        x, y, w, h = cv2.boundingRect(contour)
+        rect = (x, y, x + w, y + h)
+        # Rectangles of separate groups can still overlap; merge until none does
+        while any(overlaps(rect, group) for group in groups):
+            merged = [group for group in groups if overlaps(rect, group)] + [rect]
+            groups = [group for group in groups if not overlaps(rect, group)]
+            rect = (min(g[0] for g in merged), min(g[1] for g in merged),
+                    max(g[2] for g in merged), max(g[3] for g in merged))
+        groups.append(rect)
+    return groups
+
+def edge_map(image, boxes):
+    """Canny edges (0/255) of image, computed only over the groups of boxes.
+
+    Canny runs on each group's rectangle, so the gaps between separate
+    figures are not read. Pixels outside every group are 0.
+    """
+    groups = box_groups(image.shape, boxes)
+    if len(groups) == 1 and groups[0] == (0, 0, image.shape[1], image.shape[0]):
+        return cv2.Canny(image, 50, 150)
+    edges = np.zeros(image.shape[:2], np.uint8)
+    for x0, y0, x1, y1 in groups:
+        edges[y0:y1, x0:x1] = cv2.Canny(image[y0:y1, x0:x1], 50, 150)
+    return edges
+
+def score_regions(page_image, boxes):
+    """score_region for every box, from one edge map and integral images of the page.
+
+    Each box then costs a few lookups whatever its size, so overlapping
+    and numerous candidates no longer mean re-reading the same pixels.
+    The std-dev is exact; edges are found over groups of overlapping
+    boxes that passed it instead of per crop, which can only change the
+    edge count along a box's border.
+    """
+    if not boxes:
+        return []
+    x, y, w, h = (np.array(column) for column in zip(*boxes))
+    # Only the part of the page the boxes span is read
+    left, top = x.min(), y.min()
+    span = page_image[top:(y + h).max(), left:(x + w).max()]
+    x, y = x - left, y - top
+    
+    # Channels side by side in one plane: a box's columns x*c to (x+w)*c
+    # hold every channel of its pixels, so one lookup sums them all
+    channels = span.shape[2] if span.ndim == 3 else 1
+    plane = span.reshape(span.shape[0], -1)
+    sdepth = cv2.CV_32S if plane.size * 255 < 2**31 else cv2.CV_64F
+    sums, squares = cv2.integral2(plane, sdepth=sdepth, sqdepth=cv2.CV_64F)
+    
+    # Same statistic as np.std(roi): over every channel value of the box
+    count = w * h * channels
+    total = box_sums(sums, x * channels, y, w * channels, h).astype(np.float64)
+    total_squares = box_sums(squares, x * channels, y, w * channels, h)
+    mean = total / count
+    std_dev = np.sqrt(np.maximum(total_squares / count - mean * mean, 0))
+    keep = std_dev >= 20
+    if not keep.any():
+        return keep.tolist()
+    
+    # Edges are only needed where the std-dev test passed
+    edges = cv2.integral(edge_map(span, zip(x[keep], y[keep], w[keep], h[keep])))
+    edge_density = box_sums(edges, x, y, w, h) / 255 / (w * h)
+    return (keep & (edge_density <= 0.4)).tolist()
+
+def detect_images_in_page(page_image, batched=None):
+    """Bounding boxes (x, y, w, h) of the picture-like regions of a rendered page.
+
+    Candidates are scored crop by crop (batched=False) or all at once with
+    score_regions (batched=True). By default the batch is used when the
+    candidates overlap, i.e. cropping them would read more pixels than the
+    area they span; both cost about the same per pixel read.
+    """
     # Convert to grayscale
     gray = cv2.cvtColor(page_image, cv2.COLOR_BGR2GRAY)
     
@@ -22,7 +127,7 @@ def detect_images_in_page(page_image):
     # Find contours
     contours, _ = cv2.findContours(closed, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
     
-    image_regions = []
+    candidates = []
     min_area = 2500  # Increased minimum area to ignore small elements
     
     for contour in contours:
@@ -34,64 +139,116 @@ def detect_images_in_page(page_image):
         
         # Aspect ratio filtering
         if 0.3 < (w/h) < 4:
-            # Analyze region content
-            roi = page_image[y:y+h, x:x+w]
-            
-            # Check for sufficient color variation
-            std_dev = np.std(roi)
-            if std_dev < 20:  # Skip low-variance regions
-                continue
-                
-            # Edge density check
-            edges = cv2.Canny(roi, 50, 150)
-            edge_density = np.sum(edges > 0) / (w * h)
-            if edge_density > 0.4:  # Likely text
-                continue
-                
-            # Expand region slightly
-            x, y = max(0, x-5), max(0, y-5)
-            w, h = min(w+10, page_image.shape[1]-x), min(h+10, page_image.shape[0]-y)
-            image_regions.append((x, y, w, h))
+            candidates.append((x, y, w, h))
+    
+    if batched is None and candidates:
+        x, y, w, h = (np.array(column) for column in zip(*candidates))
+        span = ((x + w).max() - x.min()) * ((y + h).max() - y.min())
+        batched = int((w * h).sum()) > span
+    if batched:
+        keep = score_regions(page_image, candidates)
+    else:
+        keep = [score_region(page_image, box) for box in candidates]
+    
+    image_regions = []
+    for (x, y, w, h), is_image in zip(candidates, keep):
+        if not is_image:
+            continue
+        # Expand region slightly
+        x, y = max(0, x-5), max(0, y-5)
+        w, h = min(w+10, page_image.shape[1]-x), min(h+10, page_image.shape[0]-y)
+        image_regions.append((x, y, w, h))
     
     return image_regions
 
-def extract_images_cv(input_pdf_path, output_folder="extracted-images-cv"):
+def covered(region, rects, zoom, overlap=0.5):
+    """True if most of a rendered region lies inside one of rects (page coordinates)."""
+    x, y, w, h = region
+    box = fitz.Rect(x, y, x + w, y + h) / zoom
+    return any(abs(box & rect) >= overlap * abs(box) for rect in rects)
+
+def extract_page(pdf_document, page_num, output_folder, exclude=()):
+    """Save the image regions of one page; returns (saved filenames, regions found).
+
+    Regions mostly inside one of the exclude rects (page coordinates, e.g.
+    embedded images saved some other way) are left out.
+    """
+    zoom = 2  # Better resolution
+    page = pdf_document[page_num]
+    pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom))
+    img_data = pix.samples
+    
+    page_image = np.frombuffer(img_data, dtype=np.uint8).reshape(
+        pix.height, pix.width, pix.n)
+    
+    image_regions = [region for region in detect_images_in_page(page_image)
+                     if not covered(region, exclude, zoom)]
+    
+    filenames = []
+    for i, (x, y, w, h) in enumerate(image_regions):
+        # Extract and validate region
+        if w < 20 or h < 20:  # Minimum size check
+            continue
+            
+        roi = page_image[y:y+h, x:x+w]
+        if roi.size == 0:
+            continue
+        
+        # Convert and save
+        roi = cv2.cvtColor(roi, cv2.COLOR_BGR2RGB)
+        pil_image = Image.fromarray(roi)
+        
+        filename = f"image_p{page_num+1}_{i+1}_{w}x{h}.png"
+        pil_image.save(os.path.join(output_folder, filename))
+        filenames.append(filename)
+    
+    return filenames, len(image_regions)
+
+def extract_page_range(input_pdf_path, start, stop, output_folder):
+    """Worker: open the PDF in this process and extract pages start to stop-1."""
+    pdf_document = fitz.open(input_pdf_path)
+    try:
+        return [extract_page(pdf_document, page_num, output_folder)
+                for page_num in range(start, stop)]
+    finally:
+        pdf_document.close()
+
+def page_ranges(page_count, jobs):
+    """Split the pages into a few ranges per job, so a slow range does not hold up the rest."""
+    size = max(1, -(-page_count // (jobs * 4)))
+    return [(start, min(start + size, page_count)) for start in range(0, page_count, size)]
+
+def iter_pages(input_pdf_path, output_folder, jobs):
+    """Yield (filenames, regions found) for every page, in page order."""
+    with fitz.open(input_pdf_path) as pdf_document:
+        page_count = len(pdf_document)
+        if jobs <= 1:
+            for page_num in range(page_count):
+                yield extract_page(pdf_document, page_num, output_folder)
+            return
+    
+    # Every worker opens its own document; map hands back the ranges in order
+    ranges = page_ranges(page_count, jobs)
+    with ProcessPoolExecutor(jobs) as executor:
+        for results in executor.map(extract_page_range, [input_pdf_path] * len(ranges),
+                                    [start for start, _ in ranges], [stop for _, stop in ranges],
+                                    [output_folder] * len(ranges)):
+            yield from results
+
+def extract_images_cv(input_pdf_path, output_folder="extracted-images-cv", jobs=1):
     try:
         if not os.path.exists(output_folder):
             os.makedirs(output_folder)
 
-        pdf_document = fitz.open(input_pdf_path)
         image_count = 0
         
-        for page_num in range(len(pdf_document)):
-            page = pdf_document[page_num]
-            pix = page.get_pixmap(matrix=fitz.Matrix(2, 2))  # Better resolution
-            img_data = pix.samples
-            
-            page_image = np.frombuffer(img_data, dtype=np.uint8).reshape(
-                pix.height, pix.width, pix.n)
-            
-            image_regions = detect_images_in_page(page_image)
-            
-            for i, (x, y, w, h) in enumerate(image_regions):
-                # Extract and validate region
-                if w < 20 or h < 20:  # Minimum size check
-                    continue
-                    
-                roi = page_image[y:y+h, x:x+w]
-                if roi.size == 0:
-                    continue
-                
-                # Convert and save
-                roi = cv2.cvtColor(roi, cv2.COLOR_BGR2RGB)
-                pil_image = Image.fromarray(roi)
-                
-                filename = f"image_p{page_num+1}_{i+1}_{w}x{h}.png"
-                pil_image.save(os.path.join(output_folder, filename))
+        for page_num, (filenames, region_count) in enumerate(
+                iter_pages(input_pdf_path, output_folder, jobs)):
+            for filename in filenames:
                 image_count += 1
                 print(f"Extracted: {filename}")
 
-            print(f"Page {page_num+1}: Found {len(image_regions)} valid image regions")
+            print(f"Page {page_num+1}: Found {region_count} valid image regions")
             
         print(f"\nTotal {image_count} images extracted to {output_folder}")
         return True
@@ -101,9 +258,11 @@ def extract_images_cv(input_pdf_path, output_folder="extracted-images-cv"):
         return False
 
 if __name__ == "__main__":
-    if len(sys.argv) != 2:
-        print("Usage: python extract-images-cv.py <path_to_pdf>")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(description='Extract picture regions from a PDF with OpenCV')
+    parser.add_argument('input_pdf_path', help='PDF to extract images from')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help=f'Worker processes rendering pages in parallel '
+                             f'(default: 1, this machine has {os.cpu_count()} cores)')
+    args = parser.parse_args()
 
-    input_pdf_path = sys.argv[1]
-    extract_images_cv(input_pdf_path) 
\ No newline at end of file
+    extract_images_cv(args.input_pdf_path, jobs=args.jobs) 
@@ -2,10 +2,40 @@ import os
 import fitz  # PyMuPDF
 import PIL.Image
 import io
-import sys
+import argparse
 import numpy as np
 
-def extract_images(input_pdf_path, output_folder="extracted-images", image_name_prefix="image"):
+from image_index import ImageIndex, dhash, thumbnail
+
+def is_duplicate(index, image_hash, image_path, duplicates):
+    """Skip or link an image the index already has a near-copy of; True if it did."""
+    match = index.find(image_hash)
+    if match is None:
+        return False
+    existing, distance = match
+    name = os.path.basename(image_path)
+    if existing == os.path.abspath(image_path):
+        print(f"Skipping {name} (extracted in an earlier run)")
+    elif duplicates == 'link' and not os.path.lexists(image_path):
+        os.symlink(existing, image_path)
+        print(f"Linked {name} to {existing} (distance {distance})")
+    else:
+        print(f"Skipping {name} (duplicate of {existing}, distance {distance})")
+    return True
+
+def extract_images(input_pdf_path, output_folder="extracted-images", image_name_prefix="image",
+                   passthrough=False, index=None, duplicates='skip'):
+    """Save the embedded images of a PDF.
+
+    With passthrough, the stored image bytes are written unchanged instead
+    of being decoded and saved again with PIL: sizes come from the image
+    metadata, the near-black check uses a thumbnail, and an image that
+    appears on several pages is written once.
+
+    With an ImageIndex, images close to one saved before (by this or any
+    earlier run using the index) are skipped, or saved as a symlink to
+    it when duplicates is 'link'.
+    """
     try:
         # Create output directory if it doesn't exist
         if not os.path.exists(output_folder):
@@ -16,6 +46,7 @@ def extract_images(input_pdf_path, output_folder="extracted-images", image_name_
         
         # Counter for naming images
         image_count = 0
+        seen_xrefs = set()
 
         # Iterate through each page
         for page_num in range(len(pdf_document)):
@@ -27,6 +58,10 @@ def extract_images(input_pdf_path, output_folder="extracted-images", image_name_
             # Process each image
             for img_index, img in enumerate(images):
                 xref = img[0]
+                if passthrough:
+                    if xref in seen_xrefs:
+                        continue
+                    seen_xrefs.add(xref)
                 base_image = pdf_document.extract_image(xref)
                 
                 if base_image is None:
@@ -35,6 +70,30 @@ def extract_images(input_pdf_path, output_folder="extracted-images", image_name_
                 image_bytes = base_image["image"]
                 image_ext = base_image["ext"]
                 
+                if passthrough:
+                    size = (base_image["width"], base_image["height"])
+                    if size[0] < 10 or size[1] < 10:
+                        print(f"Skipping too small image on page {page_num + 1}")
+                        continue
+                    small = thumbnail(image_bytes)
+                    if np.asarray(small).mean() < 5:
+                        print(f"Skipping nearly black image on page {page_num + 1}")
+                        continue
+                    
+                    image_filename = f"{image_name_prefix}_{page_num + 1}_{img_index + 1}.{image_ext}"
+                    image_path = os.path.join(output_folder, image_filename)
+                    image_hash = dhash(small) if index is not None else None
+                    if index is not None and is_duplicate(index, image_hash, image_path, duplicates):
+                        continue
+                    with open(image_path, 'wb') as f:
+                        f.write(image_bytes)
+                    if index is not None:
+                        index.add(image_hash, image_path, f"{input_pdf_path}#{page_num + 1}")
+                    image_count += 1
+                    
+                    print(f"Saved image: {image_filename} (Size: {size}, Format: {image_ext.upper()})")
+                    continue
+                
                 # Load it to PIL
                 image = PIL.Image.open(io.BytesIO(image_bytes))
                 
@@ -52,9 +111,14 @@ def extract_images(input_pdf_path, output_folder="extracted-images", image_name_
                 # Generate output path
                 image_filename = f"{image_name_prefix}_{page_num + 1}_{img_index + 1}.{image_ext}"
                 image_path = os.path.join(output_folder, image_filename)
+                image_hash = dhash(image) if index is not None else None
+                if index is not None and is_duplicate(index, image_hash, image_path, duplicates):
+                    continue
                 
                 # Save the image
                 image.save(image_path)
+                if index is not None:
+                    index.add(image_hash, image_path, f"{input_pdf_path}#{page_num + 1}")
                 image_count += 1
                 
                 print(f"Saved image: {image_filename} (Size: {image.size}, Format: {image.format})")
@@ -65,14 +129,33 @@ def extract_images(input_pdf_path, output_folder="extracted-images", image_name_
     except Exception as e:
         print(f"An error occurred: {str(e)}")
         return False
+    finally:
+        if index is not None:
+            index.commit()
 
 if __name__ == "__main__":
-    if len(sys.argv) != 3:
-        print("Usage: python3 extract-images.py <path_to_pdf> <image_name_prefix>")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(description='Extract the embedded images of a PDF')
+    parser.add_argument('input_pdf_path', help='PDF to extract images from')
+    parser.add_argument('image_name_prefix', help='Prefix of the saved image filenames')
+    parser.add_argument('--passthrough', action='store_true',
+                        help='Write the images as stored in the PDF instead of decoding and '
+                             'saving them again, and write images shared by pages once')
+    parser.add_argument('--index', metavar='PATH',
+                        help='Perceptual-hash index (SQLite) of images saved by earlier runs; '
+                             'near-duplicates of them are not saved again')
+    parser.add_argument('--duplicates', choices=['skip', 'link'], default='skip',
+                        help='What to do with a near-duplicate: skip it, or save a symlink to '
+                             'the earlier copy (default: skip)')
+    parser.add_argument('--max-distance', type=int, default=4,
+                        help='Differing hash bits up to which two images are duplicates (default: 4)')
+    args = parser.parse_args()
+    index = ImageIndex(args.index, args.max_distance) if args.index else None
 
-    input_pdf_path = sys.argv[1]
-    image_name_prefix = sys.argv[2]
-    extract_images(input_pdf_path=input_pdf_path, 
+    extract_images(input_pdf_path=args.input_pdf_path, 
                    output_folder="extracted-images", 
-                   image_name_prefix=image_name_prefix) 
\ No newline at end of file
+                   image_name_prefix=args.image_name_prefix,
+                   passthrough=args.passthrough,
+                   index=index,
+                   duplicates=args.duplicates)
+    if index is not None:
+        index.close()
\ No newline at end of file
@@ -118,6 +118,34 @@ def detect_questions(page_image):
     
     return question_regions
 
+def extract_question_page(pdf_document, page_num, output_folder):
+    """Save the questions found on one page; returns [(filename, height), ...]."""
+    page = pdf_document[page_num]
+    pix = page.get_pixmap(matrix=fitz.Matrix(3, 3))
+    img_data = pix.samples
+    
+    page_image = np.frombuffer(img_data, dtype=np.uint8).reshape(
+        pix.height, pix.width, pix.n)
+    
+    question_regions = detect_questions(page_image)
+    
+    saved = []
+    for i, (y_start, y_end) in enumerate(question_regions):
+        # Extract question region
+        question_img = page_image[y_start:y_end, :]
+        
+        if question_img.size == 0:
+            continue
+        
+        # Convert to PIL Image and save
+        pil_img = Image.fromarray(cv2.cvtColor(question_img, cv2.COLOR_BGR2RGB))
+        filename = f"question_{page_num+1}_{i+1}.png"
+        output_path = os.path.join(output_folder, filename)
+        pil_img.save(output_path)
+        saved.append((filename, y_end - y_start))
+    
+    return saved
+
 def extract_questions(input_pdf_path, output_folder="extracted-questions"):
     try:
         if not os.path.exists(output_folder):
@@ -127,30 +155,9 @@ def extract_questions(input_pdf_path, output_folder="extracted-questions"):
         question_count = 0
         
         for page_num in range(len(pdf_document)):
-            page = pdf_document[page_num]
-            pix = page.get_pixmap(matrix=fitz.Matrix(3, 3))
-            img_data = pix.samples
-            
-            page_image = np.frombuffer(img_data, dtype=np.uint8).reshape(
-                pix.height, pix.width, pix.n)
-            
-            question_regions = detect_questions(page_image)
-            
-            for i, (y_start, y_end) in enumerate(question_regions):
-                # Extract question region
-                question_img = page_image[y_start:y_end, :]
-                
-                if question_img.size == 0:
-                    continue
-                
-                # Convert to PIL Image and save
-                pil_img = Image.fromarray(cv2.cvtColor(question_img, cv2.COLOR_BGR2RGB))
-                filename = f"question_{page_num+1}_{i+1}.png"
-                output_path = os.path.join(output_folder, filename)
-                pil_img.save(output_path)
-                
+            for filename, height in extract_question_page(pdf_document, page_num, output_folder):
                 question_count += 1
-                print(f"Saved: {filename} (Height: {y_end-y_start}px)")
+                print(f"Saved: {filename} (Height: {height}px)")
 
         print(f"\nSuccessfully extracted {question_count} questions to '{output_folder}'")
         return True
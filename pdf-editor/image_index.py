@@ -0,0 +1,102 @@
+import io
+import os
+import sqlite3
+
+import numpy as np
+from PIL import Image
+
+
+def thumbnail(image_bytes, size=64):
+    """Decode an image at reduced size; JPEGs are decoded straight at reduced scale."""
+    image = Image.open(io.BytesIO(image_bytes))
+    image.draft(image.mode, (size, size))
+    image.thumbnail((size, size))
+    return image
+
+
+def dhash(image):
+    """64-bit difference hash: is each pixel brighter than its right neighbour, on 9x8 gray."""
+    pixels = np.asarray(image.convert('L').resize((9, 8), Image.BILINEAR), dtype=np.int16)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+    return int(''.join('1' if bit else '0' for bit in bits), 2)
+
+
+def to_signed(value):
+    """SQLite integers are signed 64-bit."""
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+class ImageIndex:
+    """Persistent perceptual-hash index of extracted images, shared across runs.
+
+    Each saved image is stored with its dHash and path. find() returns the
+    closest stored image within max_distance differing bits using
+    multi-index hashing: the 64 bits are cut into max_distance + 1 bands,
+    and two hashes that close must agree exactly on at least one band, so
+    only the images sharing a band value are compared instead of every
+    image in the index.
+    """
+
+    def __init__(self, path, max_distance=4):
+        self.path = path
+        self.max_distance = max_distance
+        bands = max_distance + 1
+        widths = [64 // bands + (1 if band < 64 % bands else 0) for band in range(bands)]
+        offsets = [sum(widths[:band]) for band in range(bands)]
+        self.bands = [(offset, (1 << width) - 1) for offset, width in zip(offsets, widths)]
+
+        self.connection = sqlite3.connect(path)
+        self.connection.execute('''
+            CREATE TABLE IF NOT EXISTS images (
+                hash INTEGER NOT NULL,
+                path TEXT NOT NULL,
+                source TEXT
+            )''')
+        self.connection.commit()
+        self.hashes = []
+        self.paths = []
+        self.tables = [{} for _ in self.bands]
+        for value, path in self.connection.execute('SELECT hash, path FROM images'):
+            self.insert(value & ((1 << 64) - 1), path)
+        self.pending = 0
+
+    def insert(self, value, path):
+        index = len(self.hashes)
+        self.hashes.append(value)
+        self.paths.append(path)
+        for table, (offset, mask) in zip(self.tables, self.bands):
+            table.setdefault((value >> offset) & mask, []).append(index)
+
+    def find(self, value):
+        """(path, distance) of the closest indexed image still on disk, or None."""
+        candidates = set()
+        for table, (offset, mask) in zip(self.tables, self.bands):
+            candidates.update(table.get((value >> offset) & mask, ()))
+        matches = sorted(((value ^ self.hashes[index]).bit_count(), index)
+                         for index in candidates)
+        for distance, index in matches:
+            if distance > self.max_distance:
+                break
+            if os.path.exists(self.paths[index]):
+                return self.paths[index], distance
+        return None
+
+    def add(self, value, path, source=None):
+        path = os.path.abspath(path)
+        self.insert(value, path)
+        self.connection.execute('INSERT INTO images VALUES (?, ?, ?)',
+                                (to_signed(value), path, source))
+        self.pending += 1
+        if self.pending >= 1000:
+            self.commit()
+
+    def commit(self):
+        self.connection.commit()
+        self.pending = 0
+
+    def __len__(self):
+        return len(self.hashes)
+
+    def close(self):
+        self.commit()
+        self.connection.close()
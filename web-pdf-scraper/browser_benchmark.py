@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+import os
+import json
+import shutil
+import argparse
+import logging
+import tempfile
+import time
+from datetime import datetime
+
+from downloader import UniversalDownloader, load_webpage_links, page_url
+
+
+def process_tree(pid):
+    """pid and every process below it, from /proc (Linux only)."""
+    children = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat', 'r') as f:
+                # The command name may contain spaces, the parent pid follows it
+                parent = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(parent, []).append(int(entry))
+    tree, pending = [], [pid]
+    while pending:
+        current = pending.pop()
+        tree.append(current)
+        pending.extend(children.get(current, []))
+    return tree
+
+
+def tree_rss(pid):
+    """Resident memory in bytes of a process and its children, or None off Linux."""
+    if not os.path.isdir('/proc'):
+        return None
+    total = 0
+    for process in process_tree(pid):
+        try:
+            with open(f'/proc/{process}/status', 'r') as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        total += int(line.split()[1]) * 1024
+        except OSError:
+            continue
+    return total
+
+
+def bench_profile(profile, urls, headless, work_dir):
+    """Start a browser with a profile, load every URL in its own tab and time it all."""
+    download_dir = os.path.join(work_dir, profile)
+    downloader = UniversalDownloader(download_dir, headless=headless, profile=profile,
+                                     keep_browser=True)
+    result = {'profile': profile, 'pages': len(urls)}
+    try:
+        start = time.perf_counter()
+        downloader.start_browser()
+        result['startup'] = time.perf_counter() - start
+        driver_pid = downloader.driver.service.process.pid
+        before = tree_rss(driver_pid)
+
+        load_times = []
+        for url in urls:
+            downloader.open_tab()
+            start = time.perf_counter()
+            downloader.driver.get(url)
+            load_times.append(time.perf_counter() - start)
+        result['load_mean'] = sum(load_times) / len(load_times)
+        result['load_max'] = max(load_times)
+        after = tree_rss(driver_pid)
+        result['rss_per_tab'] = (after - before) / len(urls) if before is not None else None
+
+        # A kept browser costs one round trip on the next call instead of a start
+        start = time.perf_counter()
+        downloader.ensure_browser()
+        result['warm_reuse'] = time.perf_counter() - start
+    finally:
+        downloader.keep_browser = False
+        downloader.close()
+
+    # Starting again reuses the profile directory the first start created
+    downloader = UniversalDownloader(download_dir, headless=headless, profile=profile)
+    try:
+        start = time.perf_counter()
+        downloader.start_browser()
+        result['restart'] = time.perf_counter() - start
+    finally:
+        downloader.close()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare page loads and memory of the default '
+                                                 'and fast browser profiles')
+    parser.add_argument('urls', nargs='*',
+                        help='Pages to load (default: the pages in webpage_links.json)')
+    parser.add_argument('--json-file', default='webpage_links.json',
+                        help='Pages to load when no URL is given (default: webpage_links.json)')
+    parser.add_argument('--headless', action='store_true',
+                        help='Run the default profile headless too, e.g. without a display')
+    parser.add_argument('-o', '--output', default='browser-benchmark-results.json',
+                        help='JSON file the run is appended to (default: browser-benchmark-results.json)')
+    args = parser.parse_args()
+
+    urls = args.urls or [page_url(page) for page in load_webpage_links(args.json_file) or []]
+    if not urls:
+        parser.error('no pages to load')
+    logging.getLogger().setLevel(logging.WARNING)
+
+    work_dir = tempfile.mkdtemp(prefix='browser-bench-')
+    run = {'timestamp': datetime.now().isoformat(timespec='seconds'), 'results': []}
+    try:
+        for profile in ('default', 'fast'):
+            result = bench_profile(profile, urls, args.headless, work_dir)
+            rss = result['rss_per_tab']
+            print(f"{profile:>8}: start {result['startup']:6.2f}s, "
+                  f"restart {result['restart']:6.2f}s, warm reuse {result['warm_reuse'] * 1000:6.1f}ms, "
+                  f"page load {result['load_mean']:6.2f}s mean / {result['load_max']:6.2f}s max, "
+                  + (f"{rss / 2**20:7.1f} MiB per tab" if rss is not None else "memory n/a"))
+            run['results'].append(result)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    default, fast = run['results']
+    print(f"\nfast vs default: page load {fast['load_mean'] / default['load_mean']:.2f}x, "
+          f"startup {fast['startup'] / default['startup']:.2f}x")
+
+    history = []
+    if os.path.exists(args.output):
+        with open(args.output, 'r', encoding='utf-8') as f:
+            history = json.load(f)
+    history.append(run)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(history, f, indent=2)
+    print(f"Results appended to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
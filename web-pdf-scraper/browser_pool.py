@@ -0,0 +1,139 @@
+import logging
+import os
+import queue
+import threading
+import time
+
+from downloader import UniversalDownloader, page_url
+from http_fetcher import move_no_clobber
+
+
+class BrowserPool:
+    """Process webpages with several headless browsers at once.
+
+    Pages and the links found on them go through one shared queue, so the
+    links of a large page are spread over every worker. Each worker has its
+    own Chrome and its own download directory under <download_dir>/.workers,
+    which keeps the watchers from seeing each other's files. Finished files
+    are moved into download_dir without overwriting anything (see
+    move_no_clobber), so a partially downloaded file never appears there.
+    """
+
+    def __init__(self, download_dir="downloads", workers=4, http_fetcher=None, store=None,
+                 journal=None, retry_policy=None, static_links=False, metrics=None,
+                 profile='default', rename_stage=None, downloader_factory=UniversalDownloader):
+        self.download_dir = os.path.abspath(download_dir)
+        self.workers = workers
+        self.http_fetcher = http_fetcher
+        self.store = store
+        self.journal = journal
+        self.retry_policy = retry_policy
+        self.static_links = static_links
+        self.metrics = metrics
+        self.profile = profile
+        self.rename_stage = rename_stage
+        self.downloader_factory = downloader_factory
+
+        self.tasks = queue.Queue()
+        self.lock = threading.Lock()
+        self.successful = 0
+        self.failed = 0
+        self.merged = []
+
+    def worker_dir(self, index):
+        return os.path.join(self.download_dir, '.workers', f'worker-{index}')
+
+    def profile_dir(self, index):
+        """Chrome profile of a worker, kept outside .workers so it survives the run."""
+        if self.profile != 'fast':
+            return None
+        return os.path.join(self.download_dir, '.chrome-profile', f'worker-{index}')
+
+    def make_worker(self, index):
+        """A worker's downloader; its Chrome starts the first time a page or link needs it."""
+        downloader = self.downloader_factory(self.worker_dir(index), self.http_fetcher,
+                                             headless=True, store=self.store,
+                                             journal=self.journal,
+                                             retry_policy=self.retry_policy,
+                                             static_links=self.static_links,
+                                             metrics=self.metrics, profile=self.profile,
+                                             user_data_dir=self.profile_dir(index),
+                                             rename_stage=self.rename_stage)
+        downloader.on_download = self.merge
+        return downloader
+
+    def run(self, webpage_links, patterns):
+        """Download everything matched on webpage_links; returns (successful, failed)."""
+        # Browsers start lazily in the worker threads, so they still start at
+        # once, and HTTP-only runs (--http --static) work without Chrome
+        downloaders = [self.make_worker(index) for index in range(self.workers)]
+        logging.info(f"Started {len(downloaders)} workers")
+
+        for page in webpage_links:
+            self.tasks.put(('page', page, time.monotonic()))
+        threads = [threading.Thread(target=self.work, args=(downloader, patterns), daemon=True)
+                   for downloader in downloaders]
+        for thread in threads:
+            thread.start()
+        self.tasks.join()
+        for _ in threads:
+            self.tasks.put(None)
+        for thread in threads:
+            thread.join()
+        try:
+            os.rmdir(os.path.dirname(self.worker_dir(0)))
+        except OSError:
+            pass
+
+        logging.info(f"Final summary - Total downloads: {self.successful} successful, "
+                     f"{self.failed} failed")
+        if self.journal:
+            pages, done, failed = self.journal.summary()
+            logging.info(f"Journal summary - {pages} pages, {done} links done, {failed} failed")
+        return self.successful, self.failed
+
+    def work(self, downloader, patterns):
+        try:
+            while True:
+                task = self.tasks.get()
+                if task is None:
+                    return
+                try:
+                    self.handle(downloader, task, patterns)
+                except Exception as e:
+                    logging.error(f"Error processing {task[0]} {task[1]}: {str(e)}")
+                    self.count(0, 1)
+                finally:
+                    self.tasks.task_done()
+        finally:
+            downloader.close()
+            try:
+                os.rmdir(downloader.download_dir)
+            except OSError:
+                pass  # keep leftovers of failed downloads for inspection
+
+    def handle(self, downloader, task, patterns):
+        kind, item, queued = task
+        if kind == 'page':
+            logging.info(f"Processing webpage: {page_url(item)}")
+            matched_links = downloader.pending_links(downloader.page_links(item, patterns))
+            successful, failed, browser_links = downloader.fetch_over_http(matched_links)
+            self.count(successful, failed)
+            for link_info in browser_links:
+                self.tasks.put(('link', link_info, time.monotonic()))
+        elif downloader.download_link(item, queue_wait=time.monotonic() - queued):
+            self.count(1, 0)
+        else:
+            self.count(0, 1)
+
+    def count(self, successful, failed):
+        with self.lock:
+            self.successful += successful
+            self.failed += failed
+
+    def merge(self, result):
+        """Move a worker's finished download into the main download directory."""
+        path = move_no_clobber(result['path'], self.download_dir, os.path.basename(result['path']))
+        result['path'] = path
+        with self.lock:
+            self.merged.append(result)
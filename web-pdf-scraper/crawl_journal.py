@@ -0,0 +1,121 @@
+import json
+import logging
+import os
+import threading
+import time
+import urllib.parse
+
+
+class CrawlJournal:
+    """Append-only JSONL log of a crawl, replayed to resume it.
+
+    Each line is one of
+        {"page": url, "links": [{"url": ..., "type": ...}, ...]}
+        {"link": url, "state": "started" | "done" | "failed", "attempts": n}
+    written (and flushed) before moving on, so a crash loses at most the
+    link being downloaded. On restart a page whose links were recorded is not
+    loaded again and a link whose last state is "done" is not downloaded
+    again; "started" and "failed" links are retried. A torn last line from a
+    crash is ignored.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.pages = {}
+        self.states = {}
+        self.lock = threading.Lock()
+        if os.path.exists(path):
+            self.replay()
+        self.file = open(path, 'a', encoding='utf-8')
+
+    def replay(self):
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if 'links' in entry:
+                    self.pages[entry['page']] = entry['links']
+                elif 'link' in entry:
+                    self.states[entry['link']] = entry['state']
+        done = sum(state == 'done' for state in self.states.values())
+        logging.info(f"Resuming crawl journal {self.path}: {len(self.pages)} pages, "
+                     f"{done} links done")
+
+    def append(self, entry):
+        line = json.dumps(entry, ensure_ascii=False) + '\n'
+        with self.lock:
+            self.file.write(line)
+            self.file.flush()
+
+    def page_links(self, url):
+        """Links recorded for a page, or None if it has not been processed."""
+        return self.pages.get(url)
+
+    def record_page(self, url, links):
+        self.pages[url] = links
+        self.append({'page': url, 'links': links})
+
+    def is_done(self, url):
+        return self.states.get(url) == 'done'
+
+    def record_link(self, url, state, attempts=0):
+        self.states[url] = state
+        self.append({'link': url, 'state': state, 'attempts': attempts})
+
+    def summary(self):
+        """(pages, links done, links failed) over every run of this journal."""
+        states = list(self.states.values())
+        return len(self.pages), states.count('done'), states.count('failed')
+
+    def close(self):
+        with self.lock:
+            self.file.close()
+
+
+class RetryPolicy:
+    """Capped exponential backoff with a failure budget per host.
+
+    A link is tried up to attempts times, sleeping base_delay, 2*base_delay,
+    ... (at most max_delay) in between. Once a host has failed host_budget
+    times, its remaining links fail immediately instead of stalling the run.
+    """
+
+    def __init__(self, attempts=3, base_delay=2.0, max_delay=60.0, host_budget=10):
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.host_budget = host_budget
+        self.host_failures = {}
+        self.lock = threading.Lock()
+
+    def delay(self, attempt):
+        """Seconds to wait after the given (1-based) failed attempt."""
+        return min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+
+    def host_exhausted(self, url):
+        host = urllib.parse.urlsplit(url).hostname
+        with self.lock:
+            return self.host_failures.get(host, 0) >= self.host_budget
+
+    def record_failure(self, url):
+        host = urllib.parse.urlsplit(url).hostname
+        with self.lock:
+            self.host_failures[host] = self.host_failures.get(host, 0) + 1
+            if self.host_failures[host] == self.host_budget:
+                logging.error(f"{host} failed {self.host_budget} times, skipping its remaining links")
+
+    def run(self, url, attempt):
+        """Call attempt() until it returns True; returns (success, attempts made)."""
+        for n in range(1, self.attempts + 1):
+            if self.host_exhausted(url):
+                return False, n - 1
+            if attempt():
+                return True, n
+            self.record_failure(url)
+            if n < self.attempts:
+                delay = self.delay(n)
+                logging.info(f"Attempt {n} for {url} failed, retrying in {delay:.0f}s")
+                time.sleep(delay)
+        return False, self.attempts
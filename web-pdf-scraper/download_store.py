@@ -0,0 +1,117 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from http_fetcher import move_no_clobber
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class DownloadStore:
+    """Persistent index of downloaded links, deduplicated by content.
+
+    Every URL maps to the final URL it resolved to, its ETag/Last-Modified
+    validators, size and SHA-256. Payloads are stored once per SHA-256 under
+    the name they were first downloaded as; a second URL serving the same
+    bytes only gets an index row pointing at the existing file. Paths are
+    stored relative to the store directory so it can be moved as a whole.
+    """
+
+    def __init__(self, directory, path=None):
+        self.directory = os.path.abspath(directory)
+        if not os.path.exists(self.directory):
+            os.makedirs(self.directory)
+        self.path = path or os.path.join(self.directory, '.download-index.sqlite')
+        # Shared by the HTTP transfer threads and browser workers
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(self.path, check_same_thread=False)
+        self.connection.executescript('''
+            CREATE TABLE IF NOT EXISTS downloads (
+                url TEXT PRIMARY KEY,
+                final_url TEXT,
+                etag TEXT,
+                last_modified TEXT,
+                size INTEGER,
+                sha256 TEXT NOT NULL,
+                fetched_at REAL
+            );
+            CREATE TABLE IF NOT EXISTS blobs (
+                sha256 TEXT PRIMARY KEY,
+                path TEXT NOT NULL,
+                size INTEGER
+            );
+        ''')
+        self.connection.commit()
+
+    def lookup(self, url):
+        """Return the index record for url if its file is still present."""
+        with self.lock:
+            row = self.connection.execute(
+                'SELECT d.final_url, d.etag, d.last_modified, d.size, d.sha256, b.path '
+                'FROM downloads d JOIN blobs b ON b.sha256 = d.sha256 WHERE d.url = ?',
+                (url,)).fetchone()
+        if not row:
+            return None
+        final_url, etag, last_modified, size, sha256, path = row
+        path = os.path.join(self.directory, path)
+        if not os.path.exists(path):
+            return None
+        return {'url': url, 'final_url': final_url, 'etag': etag,
+                'last_modified': last_modified, 'size': size, 'sha256': sha256, 'path': path}
+
+    def conditional_headers(self, record):
+        """Request headers that turn a refetch of record into a 304 if unchanged."""
+        headers = {}
+        if record['etag']:
+            headers['If-None-Match'] = record['etag']
+        if record['last_modified']:
+            headers['If-Modified-Since'] = record['last_modified']
+        return headers
+
+    def put(self, url, source, filename, sha256, size, final_url=None, etag=None,
+            last_modified=None):
+        """Index a finished download and return the path its payload is stored at.
+
+        source is moved to filename in the store directory, unless a file
+        with the same SHA-256 is already stored, in which case it is removed.
+        """
+        with self.lock:
+            row = self.connection.execute('SELECT path FROM blobs WHERE sha256 = ?',
+                                          (sha256,)).fetchone()
+            stored = row and os.path.join(self.directory, row[0])
+            if stored and os.path.exists(stored):
+                if os.path.abspath(source) != stored:
+                    os.remove(source)
+                    logging.info(f"Same content as {os.path.basename(stored)}, not storing it twice")
+                path = stored
+            else:
+                if os.path.dirname(os.path.abspath(source)) == self.directory \
+                        and os.path.basename(source) == filename:
+                    path = os.path.abspath(source)
+                else:
+                    path = move_no_clobber(source, self.directory, filename)
+                self.connection.execute('INSERT OR REPLACE INTO blobs VALUES (?, ?, ?)',
+                                        (sha256, os.path.relpath(path, self.directory), size))
+            self.connection.execute(
+                'INSERT OR REPLACE INTO downloads VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (url, final_url or url, etag, last_modified, size, sha256, time.time()))
+            self.connection.commit()
+        return path
+
+    def add_file(self, url, path):
+        """Index a file that is already in the store directory (browser downloads)."""
+        return self.put(url, path, os.path.basename(path), file_sha256(path),
+                        os.path.getsize(path))
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
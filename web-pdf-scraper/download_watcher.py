@@ -0,0 +1,217 @@
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import threading
+import time
+
+# <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_CLOEXEC = os.O_CLOEXEC
+EVENT_HEADER = struct.Struct('iIII')
+
+PARTIAL_SUFFIXES = ('.crdownload', '.part', '.tmp')
+PARTIAL_PREFIXES = ('.com.google.Chrome.', 'Unconfirmed ')
+# A file last modified this long before a ticket opened is not its download;
+# FAT stores modification times in 2 second steps
+MTIME_SLACK = 2
+
+
+def is_partial(name):
+    """True for the temporary names Chrome writes a download under."""
+    return name.endswith(PARTIAL_SUFFIXES) or name.startswith(PARTIAL_PREFIXES)
+
+
+def load_inotify():
+    """Return libc if it provides inotify, else None."""
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        libc.inotify_init1
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+
+class DownloadWatcher:
+    """Track browser downloads in one directory, one finished file per click.
+
+    Call expect() right before the click that starts a download and pass the
+    returned ticket to wait(). Files appearing in the directory are handed to
+    the oldest open ticket; Chrome keeps the inode while it renames
+    'Unconfirmed 123.crdownload' to 'name.pdf.crdownload' and finally to
+    'name.pdf', so the final rename is matched back to the ticket that saw the
+    temporary file. Unrelated downloads finishing in between therefore never
+    complete the wrong ticket. Everything known about a ticket's file is
+    dropped once the ticket is done, so a later download that gets the same
+    name and a reused inode is still seen.
+
+    Changes are read from inotify where available. Elsewhere the directory
+    is rescanned every poll_interval seconds.
+    """
+
+    def __init__(self, directory, poll_interval=0.05):
+        self.directory = os.path.abspath(directory)
+        self.poll_interval = poll_interval
+        self.libc = load_inotify()
+        self.fd = None
+        self.thread = None
+        self.stop_read, self.stop_write = None, None
+
+        self.lock = threading.Lock()
+        self.tickets = []       # open tickets, oldest first
+        self.owners = {}        # inode -> ticket, for in-progress downloads
+        self.finished = {}      # (name, inode) -> ticket, until that ticket is done
+        self.seen = {}          # name -> inode, polling fallback only
+
+    def start(self):
+        if self.thread:
+            return
+        if self.libc:
+            self.fd = self.libc.inotify_init1(IN_CLOEXEC)
+            if self.fd < 0 or self.libc.inotify_add_watch(
+                    self.fd, os.fsencode(self.directory),
+                    IN_CREATE | IN_CLOSE_WRITE | IN_MOVED_TO) < 0:
+                logging.warning(f"inotify unavailable ({os.strerror(ctypes.get_errno())}), "
+                                "polling for downloads instead")
+                if self.fd >= 0:
+                    os.close(self.fd)
+                self.fd = None
+        if self.fd is None:
+            self.seen = self.scan()
+        self.stop_read, self.stop_write = os.pipe()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def close(self):
+        if not self.thread:
+            return
+        os.write(self.stop_write, b'x')
+        self.thread.join()
+        for fd in (self.fd, self.stop_read, self.stop_write):
+            if fd is not None:
+                os.close(fd)
+        self.thread = self.fd = self.stop_read = self.stop_write = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def expect(self):
+        """Open a ticket for the next download; call before triggering it."""
+        ticket = {'started': time.monotonic(), 'opened': time.time(), 'inode': None,
+                  'key': None, 'done': threading.Event(), 'result': None}
+        with self.lock:
+            self.tickets.append(ticket)
+        return ticket
+
+    def cancel(self, ticket):
+        """Give up on a ticket, e.g. when the click turned out not to download."""
+        with self.lock:
+            if ticket in self.tickets:
+                self.tickets.remove(ticket)
+            # Inodes are reused as soon as a file is deleted
+            if self.owners.get(ticket['inode']) is ticket:
+                del self.owners[ticket['inode']]
+            if self.finished.get(ticket['key']) is ticket:
+                del self.finished[ticket['key']]
+
+    def wait(self, ticket, timeout=60):
+        """Block until the ticket's download finishes.
+
+        Returns {'path', 'size', 'elapsed'} or None on timeout.
+        """
+        ticket['done'].wait(timeout)
+        self.cancel(ticket)
+        return ticket['result']
+
+    def run(self):
+        if self.fd is not None:
+            self.read_events()
+        else:
+            self.poll()
+
+    def read_events(self):
+        while True:
+            ready, _, _ = select.select([self.fd, self.stop_read], [], [])
+            if self.stop_read in ready:
+                return
+            data = os.read(self.fd, 64 * 1024)
+            offset = 0
+            while offset < len(data):
+                _, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+                offset += EVENT_HEADER.size
+                name = data[offset:offset + length].rstrip(b'\0')
+                offset += length
+                if mask & IN_Q_OVERFLOW:
+                    logging.warning("Download watcher queue overflowed, rescanning")
+                    for existing in self.scan():
+                        self.observe(existing)
+                elif name:
+                    # A final name is only complete once written or renamed into place
+                    self.observe(os.fsdecode(name), created=mask == IN_CREATE)
+
+    def poll(self):
+        while not select.select([self.stop_read], [], [], self.poll_interval)[0]:
+            current = self.scan()
+            for name, inode in current.items():
+                if self.seen.get(name) != inode:
+                    self.observe(name)
+            self.seen = current
+
+    def scan(self):
+        with os.scandir(self.directory) as entries:
+            return {entry.name: entry.inode() for entry in entries}
+
+    def observe(self, name, created=False):
+        if created and not is_partial(name):
+            return
+        if name.startswith('.') and not name.startswith(PARTIAL_PREFIXES):
+            return  # the download index and HttpFetcher's own .part files
+        try:
+            stat = os.stat(os.path.join(self.directory, name))
+        except OSError:
+            return  # already renamed away, the next event covers it
+        inode = stat.st_ino
+        with self.lock:
+            if is_partial(name):
+                if inode not in self.owners:
+                    ticket = self.next_unassigned()
+                    if ticket:
+                        ticket['inode'] = inode
+                    self.owners[inode] = ticket
+                return
+            if (name, inode) in self.finished:
+                return  # the same file reported twice
+            if inode in self.owners:
+                ticket = self.owners.pop(inode)
+            else:
+                # Small files can be renamed before their temporary name is seen
+                ticket = self.next_unassigned(stat.st_mtime)
+            if ticket is None or ticket not in self.tickets:
+                logging.warning(f"Download finished with nobody waiting for it: {name}")
+                return
+            self.tickets.remove(ticket)
+            ticket['key'] = (name, inode)
+            self.finished[ticket['key']] = ticket
+        ticket['result'] = {
+            'path': os.path.join(self.directory, name),
+            'size': stat.st_size,
+            'elapsed': time.monotonic() - ticket['started'],
+        }
+        ticket['done'].set()
+
+    def next_unassigned(self, modified=None):
+        """The oldest ticket without a file yet, opened before modified if given."""
+        for ticket in self.tickets:
+            if ticket['inode'] is None and (modified is None
+                                            or modified + MTIME_SLACK >= ticket['opened']):
+                return ticket
+        return None
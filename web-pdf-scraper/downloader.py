@@ -2,16 +2,81 @@ from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException
+from selenium.common.exceptions import TimeoutException, WebDriverException
 import re
 import os
 import time
 import json
 import logging
+import argparse
 import urllib.parse
 
+import requests
+
+from http_fetcher import HttpFetcher
+from download_watcher import DownloadWatcher
+from download_store import DownloadStore
+from crawl_journal import CrawlJournal, RetryPolicy
+from link_extractor import fetch_page, parse_page
+from metrics import DownloadMetrics
+from rename_stage import RenameStage
+from site_adapters import PatternAdapter, follow_link, get_adapter, resolve_link
+
+# Posts a form from a blank tab, for download forms that use method="post"
+SUBMIT_FORM_SCRIPT = """
+const form = document.createElement('form');
+form.method = 'post';
+form.action = arguments[0];
+for (const [name, value] of Object.entries(arguments[1])) {
+    const input = document.createElement('input');
+    input.type = 'hidden';
+    input.name = name;
+    input.value = value;
+    form.appendChild(input);
+}
+document.body.appendChild(form);
+form.submit();
+"""
+
+# Requests the fast profile drops in every tab; images are blocked by a pref
+FAST_BLOCKED_URLS = ['*.css', '*.css?*', '*.woff', '*.woff2', '*.ttf', '*.otf']
+
+def chrome_options(download_dir, headless=False, profile='default', user_data_dir=None):
+    """ChromeOptions for downloading into download_dir.
+
+    The 'fast' profile is for unattended runs: headless, no images, eager
+    page loads (driver.get returns at DOMContentLoaded) and a user data
+    directory kept between runs, so Chrome does not create a new profile
+    on every start.
+    """
+    options = webdriver.ChromeOptions()
+    prefs = {
+        "download.default_directory": download_dir,
+        "download.prompt_for_download": False,
+        "download.directory_upgrade": True,
+        "safebrowsing.enabled": True,
+        "plugins.always_open_pdf_externally": True
+    }
+    if profile == 'fast':
+        prefs["profile.managed_default_content_settings.images"] = 2
+        options.page_load_strategy = 'eager'
+        for argument in ("--headless=new", "--disable-extensions", "--no-first-run",
+                         "--no-default-browser-check", "--mute-audio"):
+            options.add_argument(argument)
+        if user_data_dir:
+            options.add_argument(f"--user-data-dir={user_data_dir}")
+    elif profile != 'default':
+        raise ValueError(f"Unknown browser profile '{profile}', expected 'default' or 'fast'")
+    elif headless:
+        options.add_argument("--headless=new")
+    options.add_experimental_option("prefs", prefs)
+    return options
+
 class UniversalDownloader:
-    def __init__(self, download_dir="downloads"):
+    def __init__(self, download_dir="downloads", http_fetcher=None, headless=False, store=None,
+                 journal=None, retry_policy=None, static_links=False, use_browser=True,
+                 metrics=None, profile='default', user_data_dir=None, keep_browser=False,
+                 rename_stage=None):
         self.download_dir = os.path.abspath(download_dir)
         if not os.path.exists(self.download_dir):
             os.makedirs(self.download_dir)
@@ -21,17 +86,36 @@ class UniversalDownloader:
             format='%(asctime)s - %(levelname)s - %(message)s'
         )
         
-        self.options = webdriver.ChromeOptions()
-        prefs = {
-            "download.default_directory": self.download_dir,
-            "download.prompt_for_download": False,
-            "download.directory_upgrade": True,
-            "safebrowsing.enabled": True,
-            "plugins.always_open_pdf_externally": True
-        }
-        self.options.add_experimental_option("prefs", prefs)
+        if profile == 'fast' and user_data_dir is None:
+            user_data_dir = os.path.join(self.download_dir, '.chrome-profile')
+        self.options = chrome_options(self.download_dir, headless, profile, user_data_dir)
+        self.blocked_urls = FAST_BLOCKED_URLS if profile == 'fast' else []
+        # Leave the browser running after process_from_json for the next call
+        self.keep_browser = keep_browser
         
         self.driver = None
+        self.watcher = DownloadWatcher(self.download_dir)
+        # Size and time of every browser download, in completion order
+        self.completed_downloads = []
+        # Called with each completed browser download's result dict
+        self.on_download = None
+        # Optional non-browser path for custom links, see HttpFetcher
+        self.http_fetcher = http_fetcher
+        # Optional DownloadStore of links already downloaded
+        self.store = store
+        # Optional CrawlJournal to resume from and RetryPolicy for failed links
+        self.journal = journal
+        self.retry_policy = retry_policy
+        # Parse page HTML directly instead of loading it in the browser
+        self.static_links = static_links
+        self._pattern_adapter = None
+        # Without the browser, pages and links that need it fail instead
+        self.use_browser = use_browser
+        # Optional DownloadMetrics every finished download is recorded in
+        self.metrics = metrics
+        # Optional RenameStage giving every download its olympiad name
+        self.rename_stage = rename_stage
+        self._session = None
 
     def is_drive_link(self, url):
         """Check if a URL is a Google Drive link."""
@@ -39,13 +123,10 @@ class UniversalDownloader:
 
     def download_drive_file(self, drive_link):
         """Download a file from Google Drive in a new tab."""
+        ticket = None
         try:
-            # Store current window handle
-            main_window = self.driver.current_window_handle
-            
-            # Open new tab
-            self.driver.execute_script("window.open('');")
-            self.driver.switch_to.window(self.driver.window_handles[-1])
+            # Open new tab, remembering the current one
+            main_window = self.open_tab()
             
             # Load Drive link in new tab
             self.driver.get(drive_link)
@@ -59,8 +140,9 @@ class UniversalDownloader:
             )
             
             time.sleep(1)
+            ticket = self.watcher.expect()
             download_button.click()
-            success = self.wait_for_download()
+            success = self.wait_for_download(ticket)
             
             # Close the tab and switch back
             self.driver.close()
@@ -77,6 +159,7 @@ class UniversalDownloader:
             return False
         except Exception as e:
             logging.error(f"Error downloading Drive file: {str(e)}")
+            self.watcher.cancel(ticket)
             # Ensure we switch back to main window even if there's an error
             if len(self.driver.window_handles) > 1:
                 self.driver.close()
@@ -85,15 +168,13 @@ class UniversalDownloader:
 
     def download_custom_file(self, file_url):
         """Download a file from a custom URL with redirect handling."""
+        ticket = None
         try:
-            # Store current window handle
-            main_window = self.driver.current_window_handle
-            
-            # Open new tab
-            self.driver.execute_script("window.open('');")
-            self.driver.switch_to.window(self.driver.window_handles[-1])
+            # Open new tab, remembering the current one
+            main_window = self.open_tab()
             
             # Load URL in new tab
+            ticket = self.watcher.expect()
             self.driver.get(file_url)
             time.sleep(2)  # Wait for potential redirect
             
@@ -103,13 +184,14 @@ class UniversalDownloader:
             # Check if we've been redirected to a Drive link
             if self.is_drive_link(current_url):
                 logging.info(f"Redirected to Drive link: {current_url}")
+                self.watcher.cancel(ticket)
                 # Close current tab and open a fresh one for Drive download
                 self.driver.close()
                 self.driver.switch_to.window(main_window)
                 success = self.download_drive_file(current_url)
             else:
                 # Regular download
-                success = self.wait_for_download()
+                success = self.wait_for_download(ticket)
                 # Close tab and switch back
                 self.driver.close()
                 self.driver.switch_to.window(main_window)
@@ -118,44 +200,85 @@ class UniversalDownloader:
                 
         except Exception as e:
             logging.error(f"Error downloading custom file: {str(e)}")
+            self.watcher.cancel(ticket)
             # Ensure we switch back to main window even if there's an error
             if len(self.driver.window_handles) > 1:
                 self.driver.close()
                 self.driver.switch_to.window(main_window)
             return False
 
-    def wait_for_download(self):
-        """Wait for download to complete."""
+    def download_form_file(self, link_info):
+        """Submit a download form in a new tab and click the #demo link it leads to."""
+        ticket = None
         try:
-            timeout = 60
-            start_time = time.time()
-            while time.time() - start_time < timeout:
-                if any(fname.endswith('.crdownload') for fname in os.listdir(self.download_dir)):
-                    time.sleep(1)
-                    continue
-                return True
-            return False
+            main_window = self.open_tab()
+            
+            if link_info.get('method') == 'post':
+                self.driver.execute_script(SUBMIT_FORM_SCRIPT, link_info['action'], link_info['data'])
+            else:
+                self.driver.get(link_info['url'])
+            
+            demo = WebDriverWait(self.driver, 10).until(
+                EC.presence_of_element_located((By.ID, "demo"))
+            )
+            href = demo.get_attribute('href')
+            if href and self.is_drive_link(href):
+                self.driver.close()
+                self.driver.switch_to.window(main_window)
+                return self.download_drive_file(href)
+            
+            ticket = self.watcher.expect()
+            demo.click()
+            success = self.wait_for_download(ticket)
+            
+            self.driver.close()
+            self.driver.switch_to.window(main_window)
+            return success
+        
         except Exception as e:
-            logging.error(f"Error waiting for download: {str(e)}")
+            logging.error(f"Error downloading form file: {str(e)}")
+            self.watcher.cancel(ticket)
+            if len(self.driver.window_handles) > 1:
+                self.driver.close()
+                self.driver.switch_to.window(main_window)
+            return False
+
+    def open_tab(self):
+        """Open a blank tab and switch to it; returns the handle of the previous tab."""
+        main_window = self.driver.current_window_handle
+        self.driver.execute_script("window.open('');")
+        self.driver.switch_to.window(self.driver.window_handles[-1])
+        self.block_requests()
+        return main_window
+
+    def block_requests(self):
+        """Drop the profile's blocked requests in the current tab (blocking is per tab)."""
+        if self.blocked_urls:
+            self.driver.execute_cdp_cmd('Network.enable', {})
+            self.driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': self.blocked_urls})
+
+    def wait_for_download(self, ticket, timeout=60):
+        """Wait for the download started after watcher.expect() to complete."""
+        result = self.watcher.wait(ticket, timeout)
+        if not result:
+            logging.error(f"Timed out after {timeout}s waiting for download")
             return False
+        logging.info(f"Downloaded {os.path.basename(result['path'])} "
+                     f"({result['size']} bytes in {result['elapsed']:.2f}s)")
+        self.completed_downloads.append(result)
+        if self.on_download:
+            self.on_download(result)
+        return True
 
-    def process_page(self, url, patterns):
+    def process_page(self, page, patterns):
         """Process a single webpage and download all matching files."""
-        matched_links = self.extract_links(url, patterns)
+        url = page_url(page)
+        matched_links = self.pending_links(self.page_links(page, patterns))
         
-        successful_downloads = 0
-        failed_downloads = 0
+        successful_downloads, failed_downloads, browser_links = self.fetch_over_http(matched_links)
         
-        for link_info in matched_links:
-            logging.info(f"Processing {link_info['type']} link: {link_info['url']}")
-            
-            success = False
-            if link_info['type'] == 'drive':
-                success = self.download_drive_file(link_info['url'])
-            else:
-                success = self.download_custom_file(link_info['url'])
-                
-            if success:
+        for link_info in browser_links:
+            if self.download_link(link_info):
                 successful_downloads += 1
             else:
                 failed_downloads += 1
@@ -163,29 +286,198 @@ class UniversalDownloader:
         logging.info(f"Page summary for {url}: {successful_downloads} successful, {failed_downloads} failed")
         return successful_downloads, failed_downloads
 
-    def extract_links(self, url, patterns):
-        """Extract links from webpage based on given patterns."""
+    def page_links(self, page, patterns):
+        """Matched links of a page, from the crawl journal if it was processed before."""
+        url = page_url(page)
+        links = self.journal.page_links(url) if self.journal else None
+        if links is not None:
+            logging.info(f"Using {len(links)} journaled links for {url}")
+        else:
+            links = self.extract_links(url, self.page_adapter(page, patterns), is_dynamic(page))
+            # An empty list may be a load failure, so only journal pages with links
+            if self.journal and links:
+                self.journal.record_page(url, links)
+        # Downloads are named with the tingkatan of the source they came from
+        tingkatan = page_tingkatan(page)
+        return [dict(link, tingkatan=tingkatan) for link in links] if tingkatan else links
+
+    def pending_links(self, matched_links):
+        """Drop links the crawl journal has already seen finish."""
+        if not self.journal:
+            return matched_links
+        pending = [link for link in matched_links if not self.journal.is_done(link['url'])]
+        if len(pending) < len(matched_links):
+            logging.info(f"Skipping {len(matched_links) - len(pending)} links finished in an earlier run")
+        return pending
+
+    def record_link(self, link_info, state, attempts=0):
+        if self.journal:
+            self.journal.record_link(link_info.get('source', link_info['url']), state, attempts)
+
+    def fetch_over_http(self, matched_links):
+        """Download links over HTTP when a fetcher is configured.
+
+        Each link is resolved to its file URL by its site adapter in the
+        fetcher's threads; links that only the browser can resolve are
+        returned for it. Failed transfers are retried in rounds following
+        the retry policy. Returns (successful, failed, links still needing
+        the browser).
+        """
+        if not self.http_fetcher:
+            return 0, 0, matched_links
+
+        successful_downloads = 0
+        failed_downloads = 0
+        browser_links = []
+        pending = matched_links
+        attempt = 1
+        while pending:
+            if self.retry_policy:
+                # Hosts out of failure budget get no more requests, new links included
+                exhausted = [link for link in pending if self.retry_policy.host_exhausted(link['url'])]
+                if exhausted:
+                    logging.info(f"Not requesting {len(exhausted)} links from hosts "
+                                 "that failed too often")
+                    pending = [link for link in pending if link not in exhausted]
+                    failed_downloads += len(exhausted)
+                    for link_info in exhausted:
+                        self.record_link(link_info, 'failed', attempt - 1)
+                        self.record_http_metrics(link_info, {'status': 'failed'}, attempt)
+            for link_info in pending:
+                self.record_link(link_info, 'started', attempt - 1)
+            retry = []
+            redirected = []
+            for link_info, result in zip(pending, self.http_fetcher.download_all(
+                    pending, self.resolve_link, follow_link,
+                    self.rename_stage.final_name if self.rename_stage else None)):
+                if result['status'] == 'ok':
+                    successful_downloads += 1
+                    self.record_link(link_info, 'done', attempt)
+                    self.record_http_metrics(link_info, result, attempt)
+                elif result['status'] == 'needs-browser':
+                    final_url = result.get('final_url', result['url'])
+                    if link_info['type'] != 'drive' and self.is_drive_link(final_url):
+                        # Redirected to Drive, resolve it like a Drive link next round
+                        redirected.append({'url': final_url, 'type': 'drive',
+                                           'source': link_info.get('source', link_info['url']),
+                                           'tingkatan': link_info.get('tingkatan')})
+                    else:
+                        browser_links.append(link_info)
+                elif result.get('retryable') and self.should_retry(link_info['url'], attempt):
+                    retry.append(link_info)
+                else:
+                    failed_downloads += 1
+                    self.record_link(link_info, 'failed', attempt)
+                    self.record_http_metrics(link_info, result, attempt)
+            if retry:
+                delay = self.retry_policy.delay(attempt)
+                logging.info(f"Retrying {len(retry)} failed downloads in {delay:.0f}s")
+                time.sleep(delay)
+            attempt += 1
+            pending = retry + redirected
+        return successful_downloads, failed_downloads, browser_links
+
+    def record_http_metrics(self, link_info, result, attempts):
+        if not self.metrics:
+            return
+        status = 'cached' if result.get('cached') else result['status']
+        self.metrics.record(link_info.get('source', link_info['url']), 'http', status,
+                            result.get('size'), attempts - 1,
+                            queue_wait=result.get('queue_wait'),
+                            resolve_time=result.get('resolve_time'), ttfb=result.get('ttfb'),
+                            transfer_time=result.get('transfer_time'),
+                            duration=result.get('duration'))
+
+    def resolve_link(self, link_info):
+        return resolve_link(link_info, self.http_fetcher.session, self.http_fetcher.timeout)
+
+    def should_retry(self, url, attempt):
+        if not self.retry_policy:
+            return False
+        self.retry_policy.record_failure(url)
+        return attempt < self.retry_policy.attempts and not self.retry_policy.host_exhausted(url)
+
+    def download_link(self, link_info, queue_wait=None):
+        """Download one matched link in the browser, retrying per the retry policy.
+
+        queue_wait is how long the link waited for a worker, for the metrics.
+        """
+        key = link_info.get('source', link_info['url'])
+        if self.store and self.store.lookup(link_info['url']):
+            logging.info(f"Already downloaded, skipping {link_info['url']}")
+            if self.metrics:
+                self.metrics.record(key, 'browser', 'cached', queue_wait=queue_wait)
+            return True
+        
+        if not self.use_browser:
+            logging.error(f"{link_info['url']} can only be downloaded in the browser, skipping it")
+            self.record_link(link_info, 'failed')
+            if self.metrics:
+                self.metrics.record(key, 'browser', 'failed', queue_wait=queue_wait)
+            return False
+        
+        self.ensure_browser()
+        started = time.monotonic()
+        self.record_link(link_info, 'started')
+        if self.retry_policy:
+            success, attempts = self.retry_policy.run(link_info['url'],
+                                                      lambda: self.open_link(link_info))
+        else:
+            success, attempts = self.open_link(link_info), 1
+        self.record_link(link_info, 'done' if success else 'failed', attempts)
+        
+        if self.metrics:
+            # The browser only tells us when the file started and finished
+            result = self.completed_downloads[-1] if success else {}
+            self.metrics.record(key, 'browser', 'ok' if success else 'failed',
+                                result.get('size'), max(attempts - 1, 0),
+                                queue_wait=queue_wait, transfer_time=result.get('elapsed'),
+                                duration=time.monotonic() - started)
+        return success
+
+    def open_link(self, link_info):
+        logging.info(f"Processing {link_info['type']} link: {link_info['url']}")
+        if link_info['type'] == 'drive':
+            success = self.download_drive_file(link_info['url'])
+        elif link_info['type'] == 'konsep-matematika':
+            success = self.download_form_file(link_info)
+        else:
+            success = self.download_custom_file(link_info['url'])
+        
+        if success and (self.rename_stage or self.store):
+            result = self.completed_downloads[-1]
+            if self.rename_stage:
+                result['path'] = self.rename_stage.rename(link_info, result['path'])
+            if self.store:
+                result['path'] = self.store.add_file(link_info['url'], result['path'])
+        return success
+
+    def extract_links(self, url, adapter, dynamic=False):
+        """Extract links from webpage with the page's site adapter.
+
+        In static mode the HTML is fetched and parsed without the browser,
+        unless the page is flagged dynamic or no link is found statically.
+        """
+        if self.static_links and not (dynamic or adapter.dynamic):
+            try:
+                matched_links = adapter.find_links(fetch_page(self.session(), url))
+                if matched_links:
+                    logging.info(f"Found {len(matched_links)} matching links on {url}")
+                    return matched_links
+                logging.info(f"No matching links in the HTML of {url}, loading it in the browser")
+            except Exception as e:
+                logging.warning(f"Static extraction failed for {url}, loading it in the browser: {str(e)}")
+        
         try:
+            self.ensure_browser()
             self.driver.get(url)
             WebDriverWait(self.driver, 10).until(
                 EC.presence_of_element_located((By.TAG_NAME, "body"))
             )
             
-            links = self.driver.find_elements(By.TAG_NAME, "a")
-            matched_links = []
-            
-            for link in links:
-                href = link.get_attribute('href')
-                if not href:
-                    continue
-                    
-                for pattern_info in patterns:
-                    if re.search(pattern_info['pattern'], href):
-                        matched_links.append({
-                            'url': href,
-                            'type': pattern_info['type']
-                        })
-                        break
+            # One round-trip for the rendered page instead of one per anchor
+            page = parse_page(self.driver.page_source, self.driver.current_url)
+            matched_links = adapter.find_links(page)
             
             logging.info(f"Found {len(matched_links)} matching links on {url}")
             return matched_links
@@ -197,63 +489,228 @@ class UniversalDownloader:
             logging.error(f"Error extracting links from {url}: {str(e)}")
             return []
 
-    def process_from_json(self, json_file, patterns):
+    def page_adapter(self, page, patterns):
+        """Site adapter named by a source page, else one matching patterns."""
+        if not isinstance(page, str) and page.get('adapter'):
+            return get_adapter(page['adapter'])
+        if patterns is None:
+            return get_adapter('chiuchang')
+        if self._pattern_adapter is None or self._pattern_adapter.patterns != patterns:
+            self._pattern_adapter = PatternAdapter(patterns)
+        return self._pattern_adapter
+
+    def session(self):
+        """HTTP session for static pages, shared with the fetcher if there is one."""
+        if self.http_fetcher:
+            return self.http_fetcher.session
+        if self._session is None:
+            self._session = requests.Session()
+        return self._session
+
+    def process_from_json(self, json_file, patterns=None):
         """Process multiple webpages from a JSON file."""
         try:
-            with open(json_file, 'r') as f:
-                data = json.load(f)
-            
-            if 'links' not in data:
-                logging.error("JSON file must contain a 'links' array")
-                return
-            
-            webpage_links = data['links']
-            
+            webpage_links = load_webpage_links(json_file)
             if not webpage_links:
-                logging.error("No links found in JSON file")
                 return
             
-            self.start_browser()
-            
             total_successful = 0
             total_failed = 0
             
-            for url in webpage_links:
-                logging.info(f"Processing webpage: {url}")
-                successful, failed = self.process_page(url, patterns)
+            for page in webpage_links:
+                logging.info(f"Processing webpage: {page_url(page)}")
+                successful, failed = self.process_page(page, patterns)
                 total_successful += successful
                 total_failed += failed
                 
             logging.info(f"Final summary - Total downloads: {total_successful} successful, {total_failed} failed")
+            if self.journal:
+                pages, done, failed = self.journal.summary()
+                logging.info(f"Journal summary - {pages} pages, {done} links done, {failed} failed")
             
-        except json.JSONDecodeError:
-            logging.error("Invalid JSON file format")
-        except FileNotFoundError:
-            logging.error(f"JSON file not found: {json_file}")
         except Exception as e:
             logging.error(f"Error processing JSON file: {str(e)}")
         finally:
-            if self.driver:
-                self.driver.quit()
+            if not self.keep_browser:
+                self.close()
 
     def start_browser(self):
         """Start the Chrome browser with configured options."""
         try:
+            self.watcher.start()
             self.driver = webdriver.Chrome(options=self.options)
+            self.block_requests()
             logging.info("Browser started successfully")
         except Exception as e:
             logging.error(f"Failed to start browser: {str(e)}")
             raise
 
+    def ensure_browser(self):
+        """Start the browser the first time a page or link needs it.
+
+        A browser kept from an earlier process_from_json call is reused,
+        unless it has died in the meantime.
+        """
+        if self.driver is not None and self.keep_browser:
+            try:
+                self.driver.current_window_handle
+            except WebDriverException:
+                logging.warning("The kept browser is gone, starting a new one")
+                self.driver = None
+        if self.driver is None:
+            if not self.use_browser:
+                raise RuntimeError("the browser is disabled")
+            self.start_browser()
+
+    def close(self):
+        """Quit the browser and stop watching the download directory."""
+        if self.driver:
+            self.driver.quit()
+            self.driver = None
+        self.watcher.close()
+
+def page_url(page):
+    """Pages are URLs or {"url": ..., "adapter": ..., "dynamic": true} objects."""
+    return page if isinstance(page, str) else page['url']
+
+def page_tingkatan(page):
+    """SD, SMP or SMA for pages of a source with a "tingkatan", else None."""
+    return None if isinstance(page, str) else page.get('tingkatan')
+
+def is_dynamic(page):
+    """True for pages whose links only exist after JavaScript runs."""
+    return not isinstance(page, str) and bool(page.get('dynamic'))
+
+def load_webpage_links(json_file):
+    """Return the pages listed in a JSON file, or None after logging why not.
+
+    "links" holds pages whose links are matched against the patterns passed
+    to process_page. "sources" holds {"adapter": name, "pages": [...]}
+    objects (optionally "dynamic": true, and the "tingkatan" the rename
+    stage names their files with) for pages handled by a site adapter.
+    """
+    try:
+        with open(json_file, 'r') as f:
+            data = json.load(f)
+    except json.JSONDecodeError:
+        logging.error("Invalid JSON file format")
+        return None
+    except FileNotFoundError:
+        logging.error(f"JSON file not found: {json_file}")
+        return None
+    
+    if 'links' not in data and 'sources' not in data:
+        logging.error("JSON file must contain a 'links' or 'sources' array")
+        return None
+    
+    pages = list(data.get('links', []))
+    for source in data.get('sources', []):
+        try:
+            get_adapter(source['adapter'])
+        except (KeyError, ValueError) as e:
+            logging.error(f"Invalid source in JSON file: {str(e)}")
+            return None
+        for page in source.get('pages', []):
+            pages.append({'url': page_url(page), 'adapter': source['adapter'],
+                          'dynamic': source.get('dynamic', False) or is_dynamic(page),
+                          'tingkatan': source.get('tingkatan')})
+    
+    if not pages:
+        logging.error("No links found in JSON file")
+        return None
+    return pages
+
+def write_metrics(metrics, json_path=None, prometheus_path=None):
+    """Log the metrics summary per path and write the requested files."""
+    summary = metrics.summary()
+    for path_taken, stats in summary['by_path'].items():
+        rate = stats['bytes_per_sec']
+        logging.info(f"{path_taken}: {stats['ok']} ok, {stats['cached']} cached, "
+                     f"{stats['failed']} failed, {stats['bytes']} bytes"
+                     + (f", {rate / 1024:.0f} KiB/s" if rate else ""))
+    if json_path:
+        metrics.write_json(json_path)
+        logging.info(f"Metrics written to {json_path}")
+    if prometheus_path:
+        metrics.write_prometheus(prometheus_path)
+        logging.info(f"Prometheus metrics written to {prometheus_path}")
+
 def main():
-    patterns = [
-        {'type': 'drive', 'pattern': r'drive\.google\.com'},
-        {'type': 'custom', 'pattern': r'chiuchang\.org\.tw/modules/mydownloads/visit\.php\?lid=\d+'}
-    ]
+    # Pages in "links" are matched with the chiuchang patterns
+    patterns = get_adapter('chiuchang').patterns
     
-    json_file = "webpage_links.json"
-    downloader = UniversalDownloader()
-    downloader.process_from_json(json_file, patterns)
+    parser = argparse.ArgumentParser(description='Download olympiad files linked from webpages')
+    parser.add_argument('json_file', nargs='?', default='webpage_links.json',
+                        help='JSON file with "links" and/or "sources" (default: webpage_links.json)')
+    parser.add_argument('--static', action='store_true',
+                        help='Read links from the page HTML without the browser, except for '
+                             'pages marked "dynamic" in the JSON file')
+    parser.add_argument('-o', '--download-dir', default='downloads',
+                        help='Directory to save files in (default: downloads)')
+    parser.add_argument('--http', action='store_true',
+                        help='Resolve and download links over HTTP, using the browser only when needed')
+    parser.add_argument('--concurrency', type=int, default=8,
+                        help='Concurrent HTTP downloads (default: 8)')
+    parser.add_argument('--per-host', type=int, default=2,
+                        help='Concurrent HTTP downloads per host (default: 2)')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Headless browsers processing pages in parallel (default: 1)')
+    parser.add_argument('--profile', choices=['default', 'fast'], default='default',
+                        help='Browser profile: "fast" is headless Chrome without images, CSS or '
+                             'fonts, eager page loads and a reused profile directory')
+    parser.add_argument('--rename', action='store_true',
+                        help='Give each download its olympiad name (see olim-file-renamer) as '
+                             'soon as it finishes, using the "tingkatan" of its source')
+    parser.add_argument('--tingkatan', choices=['SD', 'SMP', 'SMA'], type=str.upper,
+                        help='Tingkatan for --rename when a source has none (default: leave '
+                             'those files as they are)')
+    parser.add_argument('--no-index', action='store_true',
+                        help='Download every link again instead of skipping the ones in the '
+                             'download index')
+    parser.add_argument('--journal', metavar='PATH',
+                        help='Crawl journal (JSONL) to resume an interrupted run from')
+    parser.add_argument('--retries', type=int, default=2,
+                        help='Extra attempts for a failed download (default: 2)')
+    parser.add_argument('--host-budget', type=int, default=10,
+                        help='Failures after which a host\'s remaining links are skipped (default: 10)')
+    parser.add_argument('--metrics', metavar='PATH',
+                        help='Write per-download timings and a summary by path and host as JSON')
+    parser.add_argument('--prometheus', metavar='PATH',
+                        help='Also write the metrics in Prometheus text format')
+    args = parser.parse_args()
+
+    store = None if args.no_index else DownloadStore(args.download_dir)
+    journal = CrawlJournal(args.journal) if args.journal else None
+    retry_policy = RetryPolicy(attempts=args.retries + 1, host_budget=args.host_budget)
+    metrics = DownloadMetrics() if args.metrics or args.prometheus else None
+    rename_stage = RenameStage(args.tingkatan) if args.rename else None
+    http_fetcher = None
+    if args.http:
+        http_fetcher = HttpFetcher(args.download_dir, args.concurrency, args.per_host,
+                                   store=store)
+    try:
+        if args.workers > 1:
+            from browser_pool import BrowserPool
+            webpage_links = load_webpage_links(args.json_file)
+            if webpage_links:
+                pool = BrowserPool(args.download_dir, args.workers, http_fetcher, store=store,
+                                   journal=journal, retry_policy=retry_policy,
+                                   static_links=args.static, metrics=metrics,
+                                   profile=args.profile, rename_stage=rename_stage)
+                pool.run(webpage_links, patterns)
+        else:
+            downloader = UniversalDownloader(args.download_dir, http_fetcher, store=store,
+                                             journal=journal, retry_policy=retry_policy,
+                                             static_links=args.static, metrics=metrics,
+                                             profile=args.profile, rename_stage=rename_stage)
+            downloader.process_from_json(args.json_file, patterns)
+    finally:
+        if store:
+            store.close()
+        if journal:
+            journal.close()
+        if metrics:
+            write_metrics(metrics, args.metrics, args.prometheus)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,255 @@
+import asyncio
+import email.message
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+import urllib.parse
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+META_REFRESH = re.compile(
+    rb'<meta[^>]+http-equiv=["\']?refresh["\']?[^>]+content=["\']?\d+\s*;\s*url=([^"\'>\s]+)',
+    re.IGNORECASE)
+
+
+def content_disposition_filename(value):
+    """Return the filename of a Content-Disposition header, if any.
+
+    email.message understands both filename="..." and the RFC 5987/2231
+    filename*=UTF-8''... form.
+    """
+    if not value:
+        return None
+    message = email.message.Message()
+    message['content-disposition'] = value
+    return message.get_filename()
+
+
+def response_filename(response):
+    """Pick a safe local filename for a response."""
+    filename = content_disposition_filename(response.headers.get('Content-Disposition'))
+    if not filename:
+        path = urllib.parse.urlsplit(response.url).path
+        filename = urllib.parse.unquote(path.rstrip('/').rsplit('/', 1)[-1])
+    filename = os.path.basename(filename.replace('\\', '/')).strip()
+    return filename or 'download'
+
+
+def move_no_clobber(source, directory, filename):
+    """Move source into directory as filename, numbering it like Chrome does.
+
+    os.link fails instead of overwriting, so concurrent writers into the same
+    directory can never replace each other's files.
+    """
+    stem, ext = os.path.splitext(filename)
+    n = 0
+    while True:
+        target = os.path.join(directory, filename if n == 0 else f"{stem} ({n}){ext}")
+        try:
+            os.link(source, target)
+        except FileExistsError:
+            n += 1
+            continue
+        os.unlink(source)
+        return target
+
+
+def is_retryable(error):
+    """Server errors, rate limiting and connection problems may pass on a retry; 4xx will not."""
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        return error.response.status_code >= 500 or error.response.status_code == 429
+    return isinstance(error, (requests.ConnectionError, requests.Timeout,
+                              requests.exceptions.ChunkedEncodingError))
+
+
+def is_html(response):
+    return response.headers.get('Content-Type', '').split(';')[0].strip().lower() in (
+        'text/html', 'application/xhtml+xml')
+
+
+class HttpFetcher:
+    """Concurrent non-browser downloads for links that do not need JavaScript.
+
+    requests is blocking, so every transfer runs in a worker thread through
+    asyncio.to_thread. The global and per-host concurrency limits are
+    semaphores on the fetcher itself, taken in download(), so they hold
+    across every thread and every caller sharing the fetcher (e.g. all the
+    workers of a BrowserPool). All transfers share one Session whose
+    connection pool is sized for the global limit. Bodies are streamed to a .part file in
+    chunks and moved into place once complete, without ever overwriting an
+    existing file.
+
+    A response that is an HTML page instead of a file is reported with
+    status 'needs-browser' (after following any <meta refresh>), so the
+    caller can fall back to Selenium for it.
+    """
+
+    def __init__(self, download_dir="downloads", concurrency=8, per_host=2,
+                 chunk_size=64 * 1024, timeout=30, max_refreshes=3, store=None):
+        self.download_dir = os.path.abspath(download_dir)
+        if not os.path.exists(self.download_dir):
+            os.makedirs(self.download_dir)
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.chunk_size = chunk_size
+        self.timeout = timeout
+        self.max_refreshes = max_refreshes
+        # Optional DownloadStore: skip known links, dedup payloads
+        self.store = store
+
+        self.limit = threading.BoundedSemaphore(concurrency)
+        self.host_limits = {}
+        self.host_lock = threading.Lock()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=concurrency, pool_maxsize=concurrency)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def download(self, url, headers=None, resolve=None, follow=None, name=None):
+        """Download url in the calling thread and return a result dict.
+
+        url may also be a link dict with a 'url' key. resolve, if given, is
+        called with it first and returns the URL that serves the file, or
+        None if only the browser can get it. follow, if given, is called as
+        follow(link, page_url, html) for HTML responses without a <meta
+        refresh> and may return the next URL to try (e.g. a confirmation
+        link). name, if given, is called as name(link, filename) with the
+        server's filename and returns the filename to save the file under.
+
+        The dict always has 'url', 'status' ('ok', 'needs-browser' or
+        'failed') and the seconds spent in 'duration'; failures add 'error'
+        and whether trying again could help in 'retryable'; successful downloads
+        add 'final_url', 'path' and 'size', and 'cached' when the store
+        already had the file. 'queue_wait' is the time spent waiting for a
+        global and a per-host slot; 'resolve_time', 'ttfb' (request to
+        response headers) and 'transfer_time' are added for the stages
+        reached.
+        """
+        queued = time.monotonic()
+        # Host slot first, so a thread waiting on a busy host holds no global slot
+        with self.host_limit(url), self.limit:
+            started = time.monotonic()
+            timings = {'queue_wait': started - queued}
+            result = self.transfer(url, headers, resolve, follow, name, timings)
+        result.update(timings, duration=time.monotonic() - started)
+        return result
+
+    def host_limit(self, url):
+        host = urllib.parse.urlsplit(url if isinstance(url, str) else url['url']).hostname
+        with self.host_lock:
+            if host not in self.host_limits:
+                self.host_limits[host] = threading.BoundedSemaphore(self.per_host)
+            return self.host_limits[host]
+
+    def transfer(self, url, headers, resolve, follow, name, timings):
+        link = url
+        requested_url = url if isinstance(url, str) else url['url']
+        record = self.store.lookup(requested_url) if self.store else None
+        if record:
+            validators = self.store.conditional_headers(record)
+            if not validators:
+                # Nothing to revalidate against, trust the stored copy
+                return self.cached(record)
+            headers = {**(headers or {}), **validators}
+        try:
+            if record:
+                # Revalidate where the file came from, no need to resolve again
+                url = record['final_url']
+            elif resolve:
+                resolve_started = time.monotonic()
+                url = resolve(link)
+                timings['resolve_time'] = time.monotonic() - resolve_started
+                if url is None:
+                    return {'url': requested_url, 'status': 'needs-browser'}
+            else:
+                url = requested_url
+            for _ in range(self.max_refreshes + 1):
+                request_started = time.monotonic()
+                with self.session.get(url, headers=headers, stream=True,
+                                      timeout=self.timeout) as response:
+                    timings['ttfb'] = time.monotonic() - request_started
+                    if record and response.status_code == 304:
+                        return self.cached(record)
+                    if record and not response.ok:
+                        # e.g. an expired signed URL; the stored copy is still good
+                        logging.warning(f"Could not revalidate {requested_url} "
+                                        f"(HTTP {response.status_code}), keeping the stored copy")
+                        return self.cached(record)
+                    response.raise_for_status()
+                    if not is_html(response):
+                        filename = response_filename(response)
+                        if name:
+                            filename = name(link, filename)
+                        return self.save(requested_url, response, timings, filename)
+                    head = next(response.iter_content(64 * 1024), b'')
+                    refresh = META_REFRESH.search(head)
+                    if refresh:
+                        url = urllib.parse.urljoin(response.url, refresh.group(1).decode('latin-1'))
+                    else:
+                        url = follow and follow(link, response.url, head)
+                        if not url:
+                            break
+                logging.info(f"Following {url}")
+            return {'url': requested_url, 'final_url': response.url, 'status': 'needs-browser'}
+        except (requests.RequestException, OSError) as e:
+            logging.error(f"Error downloading {requested_url}: {str(e)}")
+            return {'url': requested_url, 'status': 'failed', 'error': str(e),
+                    'retryable': is_retryable(e)}
+
+    def save(self, url, response, timings=None, filename=None):
+        started = time.monotonic()
+        filename = filename or response_filename(response)
+        part_path = os.path.join(self.download_dir, f".{uuid.uuid4().hex}.part")
+        size = 0
+        digest = hashlib.sha256()
+        try:
+            with open(part_path, 'xb') as f:
+                for chunk in response.iter_content(self.chunk_size):
+                    f.write(chunk)
+                    digest.update(chunk)
+                    size += len(chunk)
+            if self.store:
+                path = self.store.put(url, part_path, filename, digest.hexdigest(), size,
+                                      response.url, response.headers.get('ETag'),
+                                      response.headers.get('Last-Modified'))
+            else:
+                path = move_no_clobber(part_path, self.download_dir, filename)
+        except BaseException:
+            if os.path.exists(part_path):
+                os.remove(part_path)
+            raise
+        if timings is not None:
+            timings['transfer_time'] = time.monotonic() - started
+        logging.info(f"Downloaded {os.path.basename(path)} ({size} bytes)")
+        return {'url': url, 'final_url': response.url, 'status': 'ok', 'path': path, 'size': size}
+
+    def cached(self, record):
+        logging.info(f"Already have {os.path.basename(record['path'])}, skipping {record['url']}")
+        return {'url': record['url'], 'final_url': record['final_url'], 'status': 'ok',
+                'path': record['path'], 'size': record['size'], 'cached': True}
+
+    async def fetch(self, url, headers=None, resolve=None, follow=None, name=None):
+        return await asyncio.to_thread(self.download, url, headers, resolve, follow, name)
+
+    async def fetch_all(self, urls, resolve=None, follow=None, name=None):
+        # One transfer thread per concurrency slot; the slots are shared with
+        # any other caller, so surplus threads just wait in download()
+        asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(self.concurrency))
+        return await asyncio.gather(*(self.fetch(url, resolve=resolve, follow=follow, name=name)
+                                      for url in urls))
+
+    def download_all(self, urls, resolve=None, follow=None, name=None):
+        """Download every url (or link dict) concurrently; see download().
+
+        Returns result dicts in input order.
+        """
+        if not urls:
+            return []
+        return asyncio.run(self.fetch_all(urls, resolve, follow, name))
@@ -1,78 +1,68 @@
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-import time
+import argparse
 import os
 
-def setup_chrome_driver():
-    # Set up Chrome options
-    chrome_options = webdriver.ChromeOptions()
-    
-    # Set download directory to current working directory
-    prefs = {
-        "download.default_directory": os.getcwd(),
-        "download.prompt_for_download": False,
-        "download.directory_upgrade": True,
-        "safebrowsing.enabled": True
-    }
-    chrome_options.add_experimental_option("prefs", prefs)
-    
-    return webdriver.Chrome(options=chrome_options)
+from downloader import UniversalDownloader
+from download_store import DownloadStore
+from http_fetcher import HttpFetcher
+from rename_stage import RenameStage
 
-def download_file(driver, download_button):
-    # Click download button
-    download_button.click()
-    time.sleep(2)  # Wait for redirect
-    
-    # Look for the "Download File" link on redirect page
-    try:
-        download_link = WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located((By.ID, "demo"))
-        )
-        download_link.click()
-        time.sleep(5)  # Wait for download to start
-    except Exception as e:
-        print(f"Error finding download link: {e}")
-        return False
-    
-    return True
+KOMA_URL = "https://www.konsep-matematika.com/2021/12/download-kumpulan-soal-ksn-matematika-sd.html"
 
 def main():
-    driver = setup_chrome_driver()
-    
+    parser = argparse.ArgumentParser(description='Download every "download soal" file of a konsep-matematika page')
+    parser.add_argument('url', nargs='?', default=KOMA_URL,
+                        help='konsep-matematika page with the download forms')
+    parser.add_argument('-o', '--download-dir', default=os.getcwd(),
+                        help='Directory to save files in (default: current directory)')
+    parser.add_argument('--http', action='store_true',
+                        help='Submit the forms and download the files over HTTP instead of clicking '
+                             'through them in the browser')
+    parser.add_argument('--static', action='store_true',
+                        help='Read the forms from the page HTML without the browser')
+    parser.add_argument('--direct', action='store_true',
+                        help='Never start the browser: parse the forms once, submit them '
+                             'concurrently and stream the files (implies --http --static)')
+    parser.add_argument('--concurrency', type=int, default=8,
+                        help='Concurrent form submissions and downloads (default: 8)')
+    parser.add_argument('--profile', choices=['default', 'fast'], default='default',
+                        help='Browser profile: "fast" is headless Chrome without images, CSS or '
+                             'fonts, eager page loads and a reused profile directory')
+    parser.add_argument('--rename', action='store_true',
+                        help='Give each download its olympiad name (see olim-file-renamer) as '
+                             'soon as it finishes')
+    parser.add_argument('-t', '--tingkatan', choices=['SD', 'SMP', 'SMA'], type=str.upper,
+                        default='SD', help='Tingkatan the files are named with (default: SD)')
+    parser.add_argument('--no-index', action='store_true',
+                        help='Download every file again instead of skipping the ones in the '
+                             'download index')
+    args = parser.parse_args()
+    if args.direct:
+        args.http = args.static = True
+
+    # The konsep-matematika site adapter finds the forms and resolves them
+    page = {'url': args.url, 'adapter': 'konsep-matematika'}
+    store = None if args.no_index else DownloadStore(args.download_dir)
+    http_fetcher = None
+    if args.http:
+        # All forms post to the same host, so let every slot use it
+        http_fetcher = HttpFetcher(args.download_dir, args.concurrency, args.concurrency,
+                                   store=store)
+    downloader = UniversalDownloader(args.download_dir, http_fetcher, store=store,
+                                     static_links=args.static, use_browser=not args.direct,
+                                     profile=args.profile,
+                                     rename_stage=RenameStage(args.tingkatan) if args.rename else None)
+
     try:
-        # Go to main page
-        driver.get("https://www.konsep-matematika.com/2021/12/download-kumpulan-soal-ksn-matematika-sd.html")
-        
-        # Find all download buttons (forms with submit buttons)
-        download_buttons = driver.find_elements(By.CSS_SELECTOR, "form input[type='submit'][value='download soal']")
-        
-        print(f"Found {len(download_buttons)} download buttons")
-        
-        # Download each file
-        for i, button in enumerate(download_buttons, 1):
-            print(f"\nProcessing download {i}/{len(download_buttons)}")
-            
-            # Scroll button into view
-            driver.execute_script("arguments[0].scrollIntoView(true);", button)
-            time.sleep(1)
-            
-            if download_file(driver, button):
-                print(f"Download {i} initiated successfully")
-            else:
-                print(f"Download {i} failed")
-            
-            # Go back to main page
-            driver.back()
-            time.sleep(2)
-            
+        # The browser only starts if a page or link turns out to need it
+        successful, failed = downloader.process_page(page, None)
+        print(f"Downloaded {successful} files, {failed} failed")
     except Exception as e:
         print(f"An error occurred: {e}")
-    
     finally:
         # Close browser
-        driver.quit()
+        downloader.close()
+        if store:
+            store.close()
 
 if __name__ == "__main__":
     main()
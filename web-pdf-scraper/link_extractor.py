@@ -0,0 +1,122 @@
+import html.parser
+import logging
+import re
+import urllib.parse
+
+
+class LinkMatcher:
+    """Match hrefs against a list of {'type', 'pattern'} dicts in one regex search.
+
+    The patterns are combined into one alternation of lookaheads, each
+    followed by an empty named group, so a single search reports the first
+    pattern in list order that re.search would have matched anywhere in the
+    href. Patterns that cannot be combined (e.g. backreferences, inline
+    flags) are searched one by one instead.
+    """
+
+    def __init__(self, patterns):
+        self.types = [pattern_info['type'] for pattern_info in patterns]
+        try:
+            self.combined = re.compile('|'.join(
+                f"(?=.*?(?:{pattern_info['pattern']}))(?P<p{index}>)"
+                for index, pattern_info in enumerate(patterns)), re.DOTALL)
+            self.separate = None
+        except re.error:
+            self.combined = None
+            self.separate = [re.compile(pattern_info['pattern']) for pattern_info in patterns]
+
+    def match(self, href):
+        """Return the type of the first matching pattern, or None."""
+        if self.combined:
+            match = self.combined.match(href)
+            return self.types[int(match.lastgroup[1:])] if match else None
+        for link_type, pattern in zip(self.types, self.separate):
+            if pattern.search(href):
+                return link_type
+        return None
+
+    def select(self, hrefs):
+        """Turn hrefs into the matched_links list extract_links returns."""
+        matched_links = []
+        for href in hrefs:
+            link_type = self.match(href)
+            if link_type:
+                matched_links.append({'url': href, 'type': link_type})
+        return matched_links
+
+
+class PageParser(html.parser.HTMLParser):
+    """Collect a page's anchors and forms, resolved the way the browser does.
+
+    hrefs are absolute <a href> URLs. forms are dicts with the absolute
+    'action', the 'method' ('get' or 'post'), its 'id', the hidden and text 'fields'
+    submitted with it and the values of its submit buttons ('submits').
+    ids maps element ids to their absolute href, for links found by id.
+    """
+
+    def __init__(self, base_url):
+        super().__init__()
+        self.url = base_url
+        self.base_url = base_url
+        self.hrefs = []
+        self.forms = []
+        self.ids = {}
+        self.form = None
+
+    def absolute(self, href):
+        return urllib.parse.urljoin(self.base_url, href.strip())
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == 'a':
+            href = attrs.get('href')
+            if href and not href.startswith(('javascript:', 'mailto:', '#')):
+                href = self.absolute(href)
+                self.hrefs.append(href)
+                if attrs.get('id'):
+                    self.ids[attrs['id']] = href
+        elif tag == 'form':
+            self.form = {'id': attrs.get('id'),
+                         'action': self.absolute(attrs.get('action') or self.url),
+                         'method': (attrs.get('method') or 'get').lower(),
+                         'fields': {}, 'submits': []}
+            self.forms.append(self.form)
+        elif tag in ('input', 'button') and self.form is not None:
+            kind = (attrs.get('type') or ('submit' if tag == 'button' else 'text')).lower()
+            if kind == 'submit':
+                self.form['submits'].append(attrs.get('value') or '')
+            elif kind not in ('checkbox', 'radio', 'file', 'reset', 'button', 'image') \
+                    and attrs.get('name'):
+                self.form['fields'][attrs['name']] = attrs.get('value') or ''
+        elif tag == 'base' and not self.hrefs:
+            href = attrs.get('href')
+            if href:
+                self.base_url = self.absolute(href)
+
+    def handle_endtag(self, tag):
+        if tag == 'form':
+            self.form = None
+
+
+def parse_page(html_text, url):
+    parser = PageParser(url)
+    parser.feed(html_text)
+    parser.close()
+    return parser
+
+
+def fetch_page(session, url, timeout=30, chunk_size=64 * 1024, method='get', data=None):
+    """Fetch a page without a browser and return its PageParser.
+
+    The body is fed to the parser as it arrives instead of being buffered.
+    """
+    with session.request(method, url, data=data, stream=True, timeout=timeout) as response:
+        response.raise_for_status()
+        if response.encoding is None:
+            response.encoding = 'utf-8'
+        parser = PageParser(response.url)
+        for chunk in response.iter_content(chunk_size, decode_unicode=True):
+            parser.feed(chunk)
+        parser.close()
+    logging.debug(f"Parsed {len(parser.hrefs)} anchors and {len(parser.forms)} forms from {url}")
+    return parser
@@ -0,0 +1,125 @@
+import json
+import threading
+import time
+import urllib.parse
+
+STAGES = ('queue_wait', 'resolve_time', 'ttfb', 'transfer_time', 'duration')
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+class DownloadMetrics:
+    """Per-download timings for the whole pipeline, summarised by path and host.
+
+    Each recorded download is a dict with the link 'url' and 'host', the
+    'path' it took ('http' or 'browser'), its 'status' ('ok', 'cached' or
+    'failed'), 'bytes', 'retries' and the stage timings in seconds:
+    queue_wait (waiting for a worker or connection slot), resolve_time
+    (finding the file URL), ttfb (request to response headers),
+    transfer_time (streaming the body) and duration (all of it). Stages a
+    path does not have are None; for the browser path transfer_time runs
+    from the click to the finished file.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.downloads = []
+        self.started = time.time()
+
+    def record(self, url, path, status, size=0, retries=0, **timings):
+        entry = {'url': url, 'host': urllib.parse.urlsplit(url).hostname, 'path': path,
+                 'status': status, 'bytes': size or 0, 'retries': retries}
+        for stage in STAGES:
+            entry[stage] = timings.get(stage)
+        with self.lock:
+            self.downloads.append(entry)
+
+    def summarise(self, downloads):
+        summary = {
+            'downloads': len(downloads),
+            'ok': sum(d['status'] == 'ok' for d in downloads),
+            'cached': sum(d['status'] == 'cached' for d in downloads),
+            'failed': sum(d['status'] == 'failed' for d in downloads),
+            'bytes': sum(d['bytes'] for d in downloads),
+            'retries': sum(d['retries'] for d in downloads),
+        }
+        # Throughput over the time spent actually moving bytes
+        transferred = [d for d in downloads if d['status'] == 'ok' and d['bytes']]
+        seconds = sum(d['transfer_time'] or d['duration'] or 0 for d in transferred)
+        summary['bytes_per_sec'] = sum(d['bytes'] for d in transferred) / seconds if seconds else None
+        for stage in STAGES:
+            values = sorted(d[stage] for d in downloads if d[stage] is not None)
+            if values:
+                summary[stage] = {'mean': sum(values) / len(values), 'p50': percentile(values, 0.5),
+                                  'p95': percentile(values, 0.95), 'max': values[-1]}
+        return summary
+
+    def summary(self):
+        with self.lock:
+            downloads = list(self.downloads)
+        group = lambda key: {value: self.summarise([d for d in downloads if (d[key] or '') == value])
+                             for value in sorted({d[key] or '' for d in downloads})}
+        return {
+            'started': self.started,
+            'elapsed': time.time() - self.started,
+            'total': self.summarise(downloads),
+            'by_path': group('path'),
+            'by_host': group('host'),
+            'downloads': downloads,
+        }
+
+    def write_json(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.summary(), f, indent=2)
+
+    def write_prometheus(self, path):
+        """Write the counters and stage summaries in Prometheus text format."""
+        with self.lock:
+            downloads = list(self.downloads)
+
+        def labels(**values):
+            return '{' + ','.join(f'{key}="{str(value).replace(chr(34), "")}"'
+                                  for key, value in values.items()) + '}'
+
+        counts, sizes, retries, stages = {}, {}, {}, {}
+        for d in downloads:
+            key = (d['path'], d['host'] or '')
+            counts[key + (d['status'],)] = counts.get(key + (d['status'],), 0) + 1
+            sizes[key] = sizes.get(key, 0) + d['bytes']
+            retries[key] = retries.get(key, 0) + d['retries']
+            for stage in STAGES:
+                if d[stage] is not None:
+                    stages.setdefault((stage, d['path']), []).append(d[stage])
+
+        lines = ['# HELP scraper_downloads_total Downloads by path, host and status',
+                 '# TYPE scraper_downloads_total counter']
+        lines += [f'scraper_downloads_total{labels(path=p, host=h, status=s)} {n}'
+                  for (p, h, s), n in sorted(counts.items())]
+        lines += ['# HELP scraper_download_bytes_total Bytes downloaded by path and host',
+                  '# TYPE scraper_download_bytes_total counter']
+        lines += [f'scraper_download_bytes_total{labels(path=p, host=h)} {n}'
+                  for (p, h), n in sorted(sizes.items())]
+        lines += ['# HELP scraper_download_retries_total Retried attempts by path and host',
+                  '# TYPE scraper_download_retries_total counter']
+        lines += [f'scraper_download_retries_total{labels(path=p, host=h)} {n}'
+                  for (p, h), n in sorted(retries.items())]
+        lines += ['# HELP scraper_download_stage_seconds Time spent per download stage',
+                  '# TYPE scraper_download_stage_seconds summary']
+        for (stage, path_taken), values in sorted(stages.items()):
+            values.sort()
+            for quantile in (0.5, 0.95):
+                lines.append(f'scraper_download_stage_seconds'
+                             f'{labels(stage=stage, path=path_taken, quantile=quantile)} '
+                             f'{percentile(values, quantile)}')
+            lines.append(f'scraper_download_stage_seconds_sum'
+                         f'{labels(stage=stage, path=path_taken)} {sum(values)}')
+            lines.append(f'scraper_download_stage_seconds_count'
+                         f'{labels(stage=stage, path=path_taken)} {len(values)}')
+
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
@@ -0,0 +1,71 @@
+import importlib.util
+import logging
+import os
+import threading
+
+from http_fetcher import move_no_clobber
+
+RENAMER_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                            'olim-file-renamer', 'rename.py')
+
+
+def load_renamer():
+    """Import olim-file-renamer/rename.py, which is not an installed package."""
+    spec = importlib.util.spec_from_file_location('olim_rename', RENAMER_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class RenameStage:
+    """Name each finished download the way olim-file-renamer would, as it arrives.
+
+    Links carry the 'tingkatan' (SD, SMP or SMA) of the source they were
+    found on; links without one use default_tingkatan, and are left alone
+    when that is None too. Files the renamer cannot classify keep the
+    server's name. HTTP downloads are saved straight under the new name
+    (see HttpFetcher name=), browser downloads are renamed once finished;
+    both without overwriting an existing file, so nothing needs a separate
+    rename.py pass over the download directory afterwards.
+    """
+
+    def __init__(self, default_tingkatan=None):
+        self.module = load_renamer()
+        self.default_tingkatan = default_tingkatan
+        self.renamers = {}
+        self.lock = threading.Lock()
+
+    def renamer(self, tingkatan):
+        suffix = self.module.parse_tingkatan(tingkatan)
+        with self.lock:
+            if suffix not in self.renamers:
+                self.renamers[suffix] = self.module.OlympiadRenamer(suffix)
+            return self.renamers[suffix]
+
+    def final_name(self, link, filename):
+        """The name to save a download of link under, given the server's filename."""
+        tingkatan = (link.get('tingkatan') if isinstance(link, dict) else None) \
+            or self.default_tingkatan
+        stem, suffix = os.path.splitext(filename)
+        if not tingkatan or suffix.lower() != '.pdf':
+            return filename
+        try:
+            renamer = self.renamer(tingkatan)
+        except ValueError as e:
+            logging.error(f"Not renaming {filename}: {str(e)}")
+            return filename
+        new_name, error = renamer.classify_name(renamer.normalize_spacing(stem))
+        if error:
+            logging.info(f"Keeping the name {filename}: {error}")
+            return filename
+        return new_name
+
+    def rename(self, link, path):
+        """Rename a finished file in place; returns its new path."""
+        filename = os.path.basename(path)
+        new_name = self.final_name(link, filename)
+        if new_name == filename:
+            return path
+        new_path = move_no_clobber(path, os.path.dirname(path), new_name)
+        logging.info(f"Renamed {filename} to {os.path.basename(new_path)}")
+        return new_path
@@ -0,0 +1,187 @@
+import html
+import logging
+import re
+import urllib.parse
+
+from link_extractor import LinkMatcher, fetch_page, parse_page
+
+ADAPTERS = {}
+
+
+def register(adapter_class):
+    """Class decorator adding an adapter to the registry under its name."""
+    ADAPTERS[adapter_class.name] = adapter_class()
+    return adapter_class
+
+
+def get_adapter(name):
+    try:
+        return ADAPTERS[name]
+    except KeyError:
+        raise ValueError(f"Unknown site adapter '{name}', expected one of {sorted(ADAPTERS)}")
+
+
+def resolve_link(link, session, timeout=30):
+    """Direct file URL for a link, or None when it needs the browser.
+
+    Links are dispatched on their 'type': the name of the adapter that
+    resolves them, or 'custom' for links that already point at the file.
+    """
+    adapter = ADAPTERS.get(link['type'])
+    if adapter is None:
+        return link['url']
+    return adapter.resolve(link, session, timeout)
+
+
+def follow_link(link, url, html_bytes):
+    """Next URL to try when resolving a link ended on an HTML page, or None."""
+    adapter = ADAPTERS.get(link['type'])
+    return adapter.follow(link, url, html_bytes) if adapter else None
+
+
+class SiteAdapter:
+    """How one site publishes its files.
+
+    find_links(page) turns a parsed page (see link_extractor.PageParser)
+    into link dicts with at least 'url' and 'type'; resolve(link, ...) turns
+    one of those links into the URL that serves the file, using the shared
+    requests session, or returns None when only the browser can get it.
+    follow(link, url, html) gets any HTML page served instead of the file
+    and may return the URL to continue with.
+    """
+
+    name = None
+    hosts = ()
+    # Pages whose links only appear after JavaScript runs
+    dynamic = False
+
+    def matches(self, url):
+        host = urllib.parse.urlsplit(url).hostname or ''
+        return any(host == h or host.endswith('.' + h) for h in self.hosts)
+
+    def find_links(self, page):
+        return []
+
+    def resolve(self, link, session, timeout=30):
+        return link['url']
+
+    def follow(self, link, url, html_bytes):
+        return None
+
+
+class PatternAdapter(SiteAdapter):
+    """Anchors whose href matches a {'type', 'pattern'} list, first match wins."""
+
+    name = 'patterns'
+
+    def __init__(self, patterns=()):
+        self.patterns = list(patterns)
+        self.matcher = LinkMatcher(self.patterns)
+
+    def find_links(self, page):
+        return self.matcher.select(page.hrefs)
+
+
+DRIVE_FILE_ID = [
+    re.compile(r'/file/(?:u/\d+/)?d/([\w-]{10,})'),
+    re.compile(r'[?&]id=([\w-]{10,})'),
+]
+DRIVE_CONFIRM = re.compile(r'[?&]confirm=([\w-]+)')
+
+
+def drive_file_id(url):
+    """File ID of a Drive file link (/file/d/ID/view, open?id=ID, uc?id=ID, ...)."""
+    if '/folders/' in url:
+        return None
+    for pattern in DRIVE_FILE_ID:
+        match = pattern.search(url)
+        if match:
+            return match.group(1)
+    return None
+
+
+@register
+class DriveAdapter(SiteAdapter):
+    """Google Drive files, fetched from the direct download endpoint.
+
+    Links that are not plain files (folders, Docs) resolve to None and keep
+    using the Drive viewer in the browser. Files too large for the virus
+    scan are served as a warning page first; follow() picks the confirmation
+    link or form out of it.
+    """
+
+    name = 'drive'
+    hosts = ('drive.google.com', 'docs.google.com', 'drive.usercontent.google.com')
+    download_url = 'https://drive.google.com/uc?export=download&id={}'
+
+    def find_links(self, page):
+        return [{'url': href, 'type': self.name} for href in page.hrefs if self.matches(href)]
+
+    def resolve(self, link, session, timeout=30):
+        file_id = drive_file_id(link['url'])
+        return self.download_url.format(file_id) if file_id else None
+
+    def follow(self, link, url, html_bytes):
+        page = parse_page(html_bytes.decode('utf-8', 'replace'), url)
+        for form in page.forms:
+            if form['id'] == 'download-form' or 'confirm' in form['fields']:
+                return form['action'] + '?' + urllib.parse.urlencode(form['fields'])
+        # Older warning pages link to uc?export=download&confirm=TOKEN&id=ID
+        for href in page.hrefs:
+            if DRIVE_CONFIRM.search(href) and drive_file_id(href):
+                return href
+        match = DRIVE_CONFIRM.search(html.unescape(html_bytes.decode('utf-8', 'replace')))
+        file_id = drive_file_id(link['url'])
+        if match and file_id:
+            return self.download_url.format(file_id) + '&confirm=' + match.group(1)
+        return None
+
+
+@register
+class ChiuchangAdapter(PatternAdapter):
+    """IMAS problem pages on chiuchang.org: mydownloads visit links and Drive links."""
+
+    name = 'chiuchang'
+    hosts = ('chiuchang.org', 'chiuchang.org.tw')
+
+    def __init__(self):
+        super().__init__([
+            {'type': 'drive', 'pattern': r'drive\.google\.com'},
+            {'type': 'custom', 'pattern': r'chiuchang\.org\.tw/modules/mydownloads/visit\.php\?lid=\d+'},
+        ])
+
+
+@register
+class KonsepMatematikaAdapter(SiteAdapter):
+    """konsep-matematika.com: every file is a form whose result page links it as #demo.
+
+    The form is submitted with a direct request and the #demo link read from
+    the returned HTML, instead of clicking through it in the browser.
+    """
+
+    name = 'konsep-matematika'
+    hosts = ('konsep-matematika.com',)
+    submit_value = 'download soal'
+
+    def find_links(self, page):
+        links = []
+        for form in page.forms:
+            if not any(value.strip().lower() == self.submit_value for value in form['submits']):
+                continue
+            # The submitted URL identifies the file in the journal and store
+            query = urllib.parse.urlencode(form['fields'])
+            url = form['action'] + ('&' if '?' in form['action'] else '?') + query if query \
+                else form['action']
+            links.append({'url': url, 'type': self.name, 'method': form['method'],
+                          'action': form['action'], 'data': form['fields']})
+        return links
+
+    def resolve(self, link, session, timeout=30):
+        if link.get('method') == 'post':
+            page = fetch_page(session, link['action'], timeout, method='post', data=link['data'])
+        else:
+            page = fetch_page(session, link['url'], timeout)
+        if 'demo' not in page.ids:
+            logging.warning(f"No #demo link on the form result page of {link['url']}")
+            return None
+        return page.ids['demo']